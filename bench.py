@@ -0,0 +1,280 @@
+import contextlib
+import os
+import random
+import sys
+import time
+
+from bitboard import BitBoard
+from octigame import OctiGame, print_observer
+from player import Player
+
+
+def bench_perft(max_depth=4):
+    """Prints perft leaf counts and nodes/second from the initial position."""
+    for depth in range(1, max_depth + 1):
+        game = OctiGame(Player(0), Player(1), BitBoard())
+        start = time.perf_counter()
+        nodes = game.perft(depth)
+        elapsed = time.perf_counter() - start
+        print(f"perft({depth}) = {nodes} nodes in {elapsed:.3f}s ({nodes / max(elapsed, 1e-9):,.0f} nodes/s)")
+
+
+def bench_evaluations(depth=3, moves=6):
+    """Compares evaluations/second of per-leaf, batched last-ply and cached search with an untrained OctiNet."""
+    from evalcache import CachedEvaluator
+    from evaluator import ModelEvaluator
+    from octinet import OctiNet
+    from playerai import OctiAIPlayer
+
+    model = OctiNet()
+    model.eval()
+    for batch_leaves, cached in ((False, False), (True, False), (True, True)):
+        evaluator = CachedEvaluator(ModelEvaluator(model)) if cached else None
+        player = OctiAIPlayer("AI", model, depth=depth, batch_leaves=batch_leaves, evaluator=evaluator)
+        game = OctiGame(Player(0), Player(1), BitBoard())
+        start = time.perf_counter()
+        for _ in range(moves):
+            if game.winner:
+                break
+            game.make_move(player.choose_move(game))
+        elapsed = time.perf_counter() - start
+        evaluator = player.evaluator
+        mode = "cached" if cached else "batched" if batch_leaves else "per-leaf"
+        print(f"{mode:>8}: {evaluator.evaluations} evaluations in {evaluator.forward_passes} forward passes, "
+              f"{elapsed:.2f}s ({evaluator.evaluations / max(elapsed, 1e-9):,.0f} evals/s)")
+        if cached:
+            print(f"          cache: {evaluator.stats()}")
+
+
+def bench_mcts(games=4, time_ms=500):
+    """Plays MCTS against alpha-beta with the same untrained OctiNet and time per move, alternating colors."""
+    from octinet import OctiNet
+    from playerai import OctiAIPlayer
+    from playermcts import OctiMCTSPlayer
+
+    model = OctiNet(policy_head=True)
+    model.eval()
+    results = {"MCTS": 0, "alpha-beta": 0, "DRAW": 0}
+    for i in range(games):
+        seats = [OctiMCTSPlayer("MCTS", model), OctiAIPlayer("alpha-beta", model)]
+        if i % 2:
+            seats.reverse()
+        game = OctiGame(seats[0], seats[1], BitBoard(), observer=None)
+        while not game.winner:
+            game.play_turn(game.get_current_player().choose_move(game, time_ms=time_ms))
+        results[game.winner if game.winner == "DRAW" else game.winner.name] += 1
+        print(f"game {i + 1}: {results}")
+
+
+def bench_parallel(depth=4, positions=4, worker_counts=(1, 2, 4, 8, 16), seed=0):
+    """Reports root-splitting and Lazy SMP speedups over worker counts at a fixed search depth."""
+    from functools import partial
+
+    from octinet import OctiNet
+    from parallelsearch import ParallelSearch
+    from playerai import OctiAIPlayer
+
+    model = OctiNet()
+    model.eval()
+    factory = partial(OctiAIPlayer, "AI", model, depth=depth)
+    rng = random.Random(seed)
+    games = []
+    for _ in range(positions + 1):  # The first position warms the workers up
+        game = OctiGame(Player(0), Player(1), BitBoard(), observer=None)
+        for _ in range(rng.randint(4, 12)):
+            game.make_move(rng.choice(game.get_possible_moves()))
+        games.append(game)
+
+    for mode in ("root", "smp"):
+        baseline = None
+        for workers in worker_counts:
+            search = ParallelSearch(factory, workers, mode)
+            try:
+                search.choose_move(games[0])
+                nodes = 0
+                start = time.perf_counter()
+                for game in games[1:]:
+                    search.choose_move(game)
+                    nodes += search.nodes
+                elapsed = time.perf_counter() - start
+            finally:
+                search.close()
+            baseline = baseline or elapsed
+            print(f"{mode:>4} x{workers:<2}: {elapsed:.2f}s, {nodes} nodes ({nodes / elapsed:,.0f} nodes/s), "
+                  f"speedup {baseline / elapsed:.2f}x")
+
+
+def bench_vecenv(num_games=4096, steps=200, seed=0):
+    """Reports random-play moves/second of VecOctiEnv against one OctiGame at a time."""
+    import numpy as np
+
+    from vecenv import VecOctiEnv
+
+    rng = np.random.default_rng(seed)
+    env = VecOctiEnv(num_games)
+    start = time.perf_counter()
+    wins = 0
+    for _ in range(steps):
+        legal = env.legal_actions()
+        # Legal entries score in [1, 2) and illegal ones in [0, 1), so argmax picks a uniformly random legal action
+        scores = legal + rng.random(legal.shape, dtype=np.float32)
+        rewards, _ = env.step(scores.argmax(axis=1), validate=False)
+        wins += int(np.count_nonzero(rewards))
+    elapsed = time.perf_counter() - start
+    moves = num_games * steps
+    print(f"vectorized: {moves} moves in {elapsed:.2f}s ({moves / elapsed:,.0f} moves/s), "
+          f"{env.games_finished} games finished, {wins} decisive")
+
+    py_rng = random.Random(seed)
+    start = time.perf_counter()
+    moves = 0
+    while time.perf_counter() - start < 2:
+        moves += play_random_game(py_rng).ply
+    elapsed = time.perf_counter() - start
+    print(f"    scalar: {moves} moves in {elapsed:.2f}s ({moves / elapsed:,.0f} moves/s)")
+
+
+def bench_inference(batch_sizes=(1, 64, 1024), repeats=200, seed=0):
+    """Compares latency and accuracy of the eager, TorchScript and int8 quantized OctiNet on real positions."""
+    import numpy as np
+    import torch
+
+    from encoding import encode_games
+    from octinet import OctiNet, compile_model
+
+    torch.set_num_threads(1)
+    rng = random.Random(seed)
+    games = []
+    while len(games) < max(batch_sizes):
+        game = OctiGame(Player(0), Player(1), BitBoard(), observer=None)
+        for _ in range(rng.randint(0, 60)):
+            if game.winner:
+                break
+            game.make_move(rng.choice(game.get_possible_moves()))
+        games.append(game)
+    inputs = torch.from_numpy(encode_games(games))
+
+    model = OctiNet()
+    model.eval()
+    variants = {"eager": model, "script": compile_model(model), "quantized": compile_model(model, quantize=True)}
+    with torch.no_grad():
+        reference = model(inputs).view(-1).numpy()
+        for name, variant in variants.items():
+            error = np.abs(variant(inputs).view(-1).numpy() - reference)
+            timings = []
+            for batch_size in batch_sizes:
+                batch = inputs[:batch_size]
+                runs = max(5, repeats * 64 // max(batch_size, 64))
+                for _ in range(3):
+                    variant(batch)
+                start = time.perf_counter()
+                for _ in range(runs):
+                    variant(batch)
+                timings.append(f"{batch_size}: {(time.perf_counter() - start) / runs * 1e6:,.0f}us")
+            print(f"{name:>9}: {', '.join(timings)} | max error {error.max():.2e}, mean error {error.mean():.2e}")
+
+
+def play_random_game(rng, observer=None):
+    """Plays one random-vs-random game through play_turn and returns it."""
+    game = OctiGame(Player(0), Player(1), BitBoard(), observer=observer)
+    while not game.winner:
+        game.play_turn(rng.choice(game.get_possible_moves()))
+    return game
+
+
+def bench_games(games=200, seed=0):
+    """Reports random-vs-random games/second with the printing observer (to /dev/null) and headless."""
+    for observer in (print_observer, None):
+        rng = random.Random(seed)
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for _ in range(games):
+                play_random_game(rng, observer)
+        elapsed = time.perf_counter() - start
+        mode = "headless" if observer is None else "printing"
+        print(f"{mode:>8}: {games} games in {elapsed:.2f}s ({games / elapsed:,.1f} games/s)")
+
+
+def bench_selfplay(num_workers=4, seconds=30):
+    """Runs the self-play pool for a while with per-worker models and with the inference server."""
+    from octinet import OctiNet
+    from player_training import SelfPlayPool
+
+    for use_inference_server in (False, True):
+        pool = SelfPlayPool(OctiNet(), num_workers, use_inference_server=use_inference_server)
+        start = time.perf_counter()
+        samples = 0
+        try:
+            for chunk in pool.results(timeout=seconds):
+                samples += len(chunk["states"])
+                if time.perf_counter() - start > seconds:
+                    break
+        finally:
+            pool.close()
+        elapsed = time.perf_counter() - start
+        mode = "inference server" if use_inference_server else "per-worker models"
+        print(f"{mode}: {samples / elapsed:,.1f} samples/s over {num_workers} workers")
+        pool.report()
+
+
+STARTUP_MODES = (("play", ["play"]), ("play --ai", ["play", "--ai"]), ("train", ["train"]),
+                 ("selfplay", ["selfplay"]), ("tablebase", ["tablebase"]),
+                 ("records", ["records", "games.rec"]), ("bench", ["bench"]))
+
+
+def bench_startup(repeats=3, top=5):
+    """
+    Reports the cold start of every main.py mode: wall time of `python -X importtime main.py --imports-only`
+    (best of `repeats`), the import time and module count it logs, and the heaviest top-level imports.
+    """
+    import subprocess
+
+    main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    for mode, args in STARTUP_MODES:
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, "-X", "importtime", main_path, "--imports-only", *args],
+                                    capture_output=True, text=True, check=True)
+            elapsed = time.perf_counter() - start
+            if best is None or elapsed < best[0]:
+                best = elapsed, result.stderr
+
+        elapsed, log = best
+        imports = []  # (cumulative us, module) of every import logged
+        for line in log.splitlines():
+            if line.startswith("import time:") and "|" in line and "self [us]" not in line:
+                _, cumulative, name = line[len("import time:"):].split("|")
+                imports.append((int(cumulative), name.rstrip()))
+        top_level = [(us, name.strip()) for us, name in imports if not name[1:].startswith(" ")]
+        heaviest = ", ".join(f"{name} {us / 1000:.0f}ms" for us, name in sorted(top_level, reverse=True)[:top])
+        print(f"{mode:>10}: {elapsed * 1000:6.0f}ms wall, {sum(us for us, _ in top_level) / 1000:6.0f}ms in "
+              f"{len(imports)} imports; heaviest: {heaviest}")
+
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else "perft"
+    if command == "evals":
+        bench_evaluations(int(argv[2]) if len(argv) > 2 else 3)
+    elif command == "inference":
+        bench_inference()
+    elif command == "vecenv":
+        bench_vecenv(int(argv[2]) if len(argv) > 2 else 4096)
+    elif command == "parallel":
+        bench_parallel(int(argv[2]) if len(argv) > 2 else 4)
+    elif command == "mcts":
+        bench_mcts(int(argv[2]) if len(argv) > 2 else 4)
+    elif command == "games":
+        bench_games(int(argv[2]) if len(argv) > 2 else 200)
+    elif command == "selfplay":
+        bench_selfplay(int(argv[2]) if len(argv) > 2 else 4)
+    elif command == "startup":
+        bench_startup(int(argv[2]) if len(argv) > 2 else 3)
+    elif command == "perft":
+        bench_perft(int(argv[2]) if len(argv) > 2 else 4)
+    else:
+        print(f"Unknown benchmark: {command}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
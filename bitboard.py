@@ -0,0 +1,241 @@
+from collections.abc import Mapping
+
+from board import DIRECTION_ORDER, DIRECTION_STEPS
+from zobrist import square_key
+
+BOARD_SIZE = 8
+FULL = (1 << 64) - 1
+COL_0 = sum(1 << (row * BOARD_SIZE) for row in range(BOARD_SIZE))
+COL_7 = COL_0 << (BOARD_SIZE - 1)
+
+N, S, E, W = range(4)
+
+
+def square_of(position):
+    """Converts a (row, col) position to a square index 0-63."""
+    return position[0] * BOARD_SIZE + position[1]
+
+
+def position_of(square):
+    """Converts a square index 0-63 to a (row, col) position."""
+    return divmod(square, BOARD_SIZE)
+
+
+def shift(mask, direction):
+    """Shifts every bit of a mask one step in a direction index, dropping bits that leave the board."""
+    if direction == N:
+        return mask >> BOARD_SIZE
+    if direction == S:
+        return (mask << BOARD_SIZE) & FULL
+    if direction == E:
+        return (mask << 1) & ~COL_0 & FULL
+    return (mask >> 1) & ~COL_7
+
+
+def iter_squares(mask):
+    """Yields the square index of every set bit in a mask."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class GridView(Mapping):
+    """Read-only (row, col) -> {"player", "prongs"} view of a BitBoard, mirroring Board.grid."""
+
+    def __init__(self, board):
+        self._board = board
+
+    def __getitem__(self, position):
+        row, col = position
+        if not (0 <= row < BOARD_SIZE and 0 <= col < BOARD_SIZE):
+            raise KeyError(position)
+        return self._board.pod_at(square_of(position))
+
+    def __iter__(self):
+        for square in range(BOARD_SIZE * BOARD_SIZE):
+            yield position_of(square)
+
+    def __len__(self):
+        return BOARD_SIZE * BOARD_SIZE
+
+
+class BitBoard:
+    """Board backend storing per-player occupancy and per-direction prong bitmasks."""
+
+    def __init__(self):
+        self.size = BOARD_SIZE
+        self.bases = [((1, 2), 0), ((1, 3), 0), ((1, 4), 0), ((1, 5), 0),
+                      ((6, 2), 1), ((6, 3), 1), ((6, 4), 1), ((6, 5), 1)]
+        self.pods = [0, 0]  # Occupancy mask per player index
+        self.prongs = [0, 0, 0, 0]  # Prong mask per direction (N, S, E, W)
+        self.players = [None, None]  # Player objects, for the dict-style grid view
+        self.hash = 0  # Zobrist key, updated by every mutation
+        self.pod_counts = [0, 0]  # Pods per player index, updated by every mutation
+        self.free_prongs = [0, 0]  # Prongs each player could still add (mobility summary), updated likewise
+        self.grid = GridView(self)
+
+    @property
+    def occupied(self):
+        return self.pods[0] | self.pods[1]
+
+    def owner(self, square):
+        """Returns the player index owning a square, or None if it is empty."""
+        bit = 1 << square
+        if self.pods[0] & bit:
+            return 0
+        if self.pods[1] & bit:
+            return 1
+        return None
+
+    def prong_mask(self, square):
+        """Returns the 4-bit prong set (bit d for direction d) of the pod on a square."""
+        bit = 1 << square
+        return sum(1 << d for d in range(4) if self.prongs[d] & bit)
+
+    def pod_at(self, square):
+        """Returns the pod on a square in the dict layout used by Board.grid."""
+        player = self.owner(square)
+        if player is None:
+            return None
+        bit = 1 << square
+        prongs = [name for d, name in enumerate(DIRECTION_ORDER) if self.prongs[d] & bit]
+        return {"player": self.players[player], "prongs": prongs}
+
+    def set_square(self, square, player, prongs):
+        """Overwrites a square with a pod of a player index and prong set, or empties it if player is None."""
+        bit = 1 << square
+        old_player, old_prongs = self.owner(square), self.prong_mask(square)
+        self.hash ^= square_key(old_player, old_prongs, square) ^ square_key(player, prongs, square)
+        if old_player is not None:
+            self.pod_counts[old_player] -= 1
+            self.free_prongs[old_player] -= 4 - old_prongs.bit_count()
+        self._clear(bit)
+        if player is None:
+            return
+        self.pod_counts[player] += 1
+        self.free_prongs[player] += 4 - prongs.bit_count()
+        self.pods[player] |= bit
+        for d in range(4):
+            if prongs >> d & 1:
+                self.prongs[d] |= bit
+
+    def step_targets(self, player, direction):
+        """Empty squares reachable by one step of the player's pods with a prong in the direction."""
+        movers = self.pods[player] & self.prongs[direction]
+        return shift(movers, direction) & ~self.occupied & FULL
+
+    def jump_targets(self, player, direction, over=None):
+        """Empty squares reachable by jumping a pod (of `over`'s occupancy, default any) in the direction."""
+        occupied = self.occupied
+        over = occupied if over is None else over
+        movers = self.pods[player] & self.prongs[direction]
+        return shift(shift(movers, direction) & over, direction) & ~occupied & FULL
+
+    def capture_targets(self, player, direction):
+        """Landing squares of jumps over an enemy pod in the direction."""
+        return self.jump_targets(player, direction, over=self.pods[1 - player])
+
+    def place_pod(self, position, player, prongs=None):
+        """Places a pod at a given position."""
+        self.players[player.index] = player
+        mask = sum(1 << DIRECTION_ORDER.index(name) for name in set(prongs or ()))
+        self.set_square(square_of(position), player.index, mask)
+
+    def move_pod(self, start_pos, end_pos):
+        """Handles pod movement, jumping, and capturing."""
+        if not self._on_board(start_pos) or self.owner(square_of(start_pos)) is None:
+            raise ValueError("No pod at the starting position!")
+        if not self._on_board(end_pos):
+            raise ValueError("Invalid move: Target position is off the board!")
+
+        start, end = square_of(start_pos), square_of(end_pos)
+        start_bit, end_bit = 1 << start, 1 << end
+        player = self.owner(start)
+
+        # Find the prong direction taking the pod to the target in one or two steps
+        direction, distance = None, 0
+        for d in range(4):
+            if not self.prongs[d] & start_bit:
+                continue
+            one_step = shift(start_bit, d)
+            if one_step == end_bit:
+                direction, distance = d, 1
+            elif one_step and shift(one_step, d) == end_bit:
+                direction, distance = d, 2
+
+        if direction is None:
+            raise ValueError("Invalid move: No prong in that direction!")
+
+        if self.occupied & end_bit:
+            raise ValueError("Invalid move: Target position occupied!")
+
+        if distance == 2:
+            mid_bit = shift(start_bit, direction)
+            if not self.occupied & mid_bit:
+                raise ValueError("Invalid jump: No pod to jump over!")
+
+            # Capture case: jumping over an enemy pod removes one of its prongs
+            if self.pods[1 - player] & mid_bit:
+                self._capture(mid_bit.bit_length() - 1)
+
+        # Move the pod and its prongs
+        prongs = self.prong_mask(start)
+        self.set_square(start, None, 0)
+        self.set_square(end, player, prongs)
+
+    def _capture(self, square):
+        """Removes the last prong of a captured pod, and the pod itself once it has none left."""
+        prongs = self.prong_mask(square)
+        if prongs:
+            prongs &= ~(1 << (prongs.bit_length() - 1))
+        self.set_square(square, self.owner(square) if prongs else None, prongs)
+
+    def add_prong(self, position, direction):
+        """Adds a prong to a pod if allowed."""
+        if not self._on_board(position) or self.owner(square_of(position)) is None:
+            raise ValueError("No pod at the given position!")
+
+        if direction not in DIRECTION_STEPS:
+            raise ValueError("Invalid prong direction!")
+
+        square = square_of(position)
+        d = DIRECTION_ORDER.index(direction)
+        if self.prongs[d] >> square & 1:
+            raise ValueError("Pod already has a prong in that direction!")
+
+        self.set_square(square, self.owner(square), self.prong_mask(square) | 1 << d)
+
+    def to_vector(self, side_to_move=0, out=None):
+        """Encodes the board as input planes for OctiNet, writing into `out` when given (see encoding.py)."""
+        from encoding import encode_board  # numpy is only needed once a network is involved
+        return encode_board(self.pods, self.prongs, side_to_move, out)
+
+    def get_new_position(self, position, direction):
+        """Returns the position one step away in a prong direction, or None if off the board."""
+        moved = shift(1 << square_of(position), DIRECTION_ORDER.index(direction))
+        return position_of(moved.bit_length() - 1) if moved else None
+
+    def is_valid_position(self, position):
+        """Returns True if the position is on the board and empty."""
+        return self._on_board(position) and not self.occupied & (1 << square_of(position))
+
+    def _on_board(self, position):
+        return 0 <= position[0] < BOARD_SIZE and 0 <= position[1] < BOARD_SIZE
+
+    def _clear(self, bit):
+        self.pods[0] &= ~bit
+        self.pods[1] &= ~bit
+        for d in range(4):
+            self.prongs[d] &= ~bit
+
+    def __repr__(self):
+        """Displays the board."""
+        occupied = self.occupied
+        display = []
+        for row in range(self.size):
+            row_display = []
+            for col in range(self.size):
+                row_display.append("P" if occupied >> (row * self.size + col) & 1 else ".")
+            display.append(" ".join(row_display))
+        return "\n".join(display)
@@ -1,4 +1,11 @@
+from zobrist import board_key
+
+# Screen offsets (dx, dy) of each prong, used for drawing
 DIRECTIONS = {"N": (0, -1), "S": (0, 1), "E": (1, 0), "W": (-1, 0)}
+# Board offsets (d_row, d_col) of each prong, used by the game rules
+DIRECTION_STEPS = {"N": (-1, 0), "S": (1, 0), "E": (0, 1), "W": (0, -1)}
+DIRECTION_ORDER = tuple(DIRECTIONS)
+
 
 class Board:
     def __init__(self):
@@ -6,6 +13,7 @@ class Board:
         self.grid = self._initialize_board()
         self.bases = [((1, 2), 0), ((1, 3), 0), ((1, 4), 0), ((1, 5), 0),
                       ((6, 2), 1), ((6, 3), 1), ((6, 4), 1), ((6, 5), 1)]
+        self.players = [None, None]  # Player objects by index, for set_square
 
     def _initialize_board(self):
         """Creates an empty board."""
@@ -17,63 +25,61 @@ class Board:
 
     def place_pod(self, position, player, prongs=None):
         """Places a pod at a given position."""
-        if prongs is None:
-            prongs = []
+        prongs = list(prongs) if prongs else []
         self.grid[position] = {"player": player, "prongs": prongs}
+        self.players[player.index] = player
 
     def move_pod(self, start_pos, end_pos):
         """Handles pod movement, jumping, and capturing."""
         if start_pos not in self.grid or self.grid[start_pos] is None:
             raise ValueError("No pod at the starting position!")
+        if end_pos not in self.grid:
+            raise ValueError("Invalid move: Target position is off the board!")
 
         pod = self.grid[start_pos]
         player = pod["player"]
 
         direction = (end_pos[0] - start_pos[0], end_pos[1] - start_pos[1])
 
-        # Determine if the move follows a valid prong direction
-        valid_prong = None
-        for prong_dir, vector in DIRECTIONS.items():
-            if vector == direction and prong_dir in pod["prongs"]:
-                valid_prong = prong_dir
-                break
-
-        # Check for jump (two-step move)
-        is_jump = (
-                not valid_prong and
-                (direction[0] % 2 == 0 and direction[1] % 2 == 0)  # Must be two-step move
-        )
+        # Determine if the move follows a prong direction, one or two steps away
+        valid_prong, distance = None, 0
+        for prong_dir, (d_row, d_col) in DIRECTION_STEPS.items():
+            for steps in (1, 2):
+                if direction == (d_row * steps, d_col * steps) and prong_dir in pod["prongs"]:
+                    valid_prong, distance = prong_dir, steps
 
-        if not valid_prong and not is_jump:
+        if not valid_prong:
             raise ValueError("Invalid move: No prong in that direction!")
 
-        if is_jump:
+        if self.grid[end_pos] is not None:
+            raise ValueError("Invalid move: Target position occupied!")
+
+        if distance == 2:
             # Compute the midpoint
             mid_pos = ((start_pos[0] + end_pos[0]) // 2, (start_pos[1] + end_pos[1]) // 2)
 
-            if mid_pos not in self.grid or self.grid[mid_pos] is None:
+            if self.grid[mid_pos] is None:
                 raise ValueError("Invalid jump: No pod to jump over!")
 
-            if self.grid[end_pos] is not None:
-                raise ValueError("Invalid move: Target position occupied!")
-
-        elif self.grid[end_pos] is not None:
-            # Capture case: Enemy pod is at end position
-            if self.grid[end_pos]["player"] == player:
-                raise ValueError("Invalid move: Cannot capture your own pod!")
-
-            # Remove a prong from the opponent's pod
-            if self.grid[end_pos]["prongs"]:
-                self.grid[end_pos]["prongs"].pop()  # Remove a random prong
-
-            # If no prongs remain, remove the pod
-            if not self.grid[end_pos]["prongs"]:
-                self.grid[end_pos] = None
+            # Capture case: jumping over an enemy pod removes one of its prongs
+            if self.grid[mid_pos]["player"] != player:
+                self._capture(mid_pos)
 
         # Move the pod
         self.grid[end_pos] = pod
         self.grid[start_pos] = None
 
+    def _capture(self, position):
+        """Removes a prong from a captured pod, and the pod itself once it has none left."""
+        prongs = self.grid[position]["prongs"]
+        for direction in reversed(DIRECTION_ORDER):
+            if direction in prongs:
+                prongs.remove(direction)
+                break
+
+        if not prongs:
+            self.grid[position] = None
+
     def add_prong(self, position, direction):
         """Adds a prong to a pod if allowed."""
         if position not in self.grid or self.grid[position] is None:
@@ -82,8 +88,85 @@ class Board:
         if direction not in DIRECTIONS:
             raise ValueError("Invalid prong direction!")
 
+        if direction in self.grid[position]["prongs"]:
+            raise ValueError("Pod already has a prong in that direction!")
+
         self.grid[position]["prongs"].append(direction)
 
+    def owner(self, square):
+        """Returns the player index owning a square (row * 8 + col), or None if it is empty."""
+        pod = self.grid[divmod(square, self.size)]
+        return pod["player"].index if pod else None
+
+    def prong_mask(self, square):
+        """Returns the 4-bit prong set (bit d for DIRECTION_ORDER[d]) of the pod on a square."""
+        pod = self.grid[divmod(square, self.size)]
+        if not pod:
+            return 0
+        return sum(1 << d for d, name in enumerate(DIRECTION_ORDER) if name in pod["prongs"])
+
+    def set_square(self, square, player, prongs):
+        """Overwrites a square with a pod of a player index and prong set, or empties it if player is None."""
+        position = divmod(square, self.size)
+        if player is None:
+            self.grid[position] = None
+            return
+        names = [name for d, name in enumerate(DIRECTION_ORDER) if prongs >> d & 1]
+        self.grid[position] = {"player": self.players[player], "prongs": names}
+
+    @property
+    def pods(self):
+        """Occupancy bitmask per player index, as kept by BitBoard."""
+        masks = [0, 0]
+        for (row, col), pod in self.grid.items():
+            if pod:
+                masks[pod["player"].index] |= 1 << (row * self.size + col)
+        return masks
+
+    @property
+    def prongs(self):
+        """Prong bitmask per direction (N, S, E, W), as kept by BitBoard."""
+        masks = [0, 0, 0, 0]
+        for (row, col), pod in self.grid.items():
+            if pod:
+                for name in pod["prongs"]:
+                    masks[DIRECTION_ORDER.index(name)] |= 1 << (row * self.size + col)
+        return masks
+
+    @property
+    def pod_counts(self):
+        """Pods per player index, as kept by BitBoard."""
+        return [mask.bit_count() for mask in self.pods]
+
+    @property
+    def free_prongs(self):
+        """Prongs each player index could still add, as kept by BitBoard."""
+        counts = [0, 0]
+        for pod in self.grid.values():
+            if pod:
+                counts[pod["player"].index] += len(DIRECTION_ORDER) - len(pod["prongs"])
+        return counts
+
+    @property
+    def hash(self):
+        """Zobrist key of the position, computed from scratch (BitBoard keeps it incrementally)."""
+        return board_key(self.pods, self.prongs)
+
+    def to_vector(self, side_to_move=0, out=None):
+        """Encodes the board as input planes for OctiNet, writing into `out` when given (see encoding.py)."""
+        from encoding import encode_board  # numpy is only needed once a network is involved
+        return encode_board(self.pods, self.prongs, side_to_move, out)
+
+    def get_new_position(self, position, direction):
+        """Returns the position one step away in a prong direction, or None if off the board."""
+        d_row, d_col = DIRECTION_STEPS[direction]
+        new_pos = (position[0] + d_row, position[1] + d_col)
+        return new_pos if new_pos in self.grid else None
+
+    def is_valid_position(self, position):
+        """Returns True if the position is on the board and empty."""
+        return position in self.grid and self.grid[position] is None
+
     def __repr__(self):
         """Displays the board."""
         display = []
@@ -0,0 +1,130 @@
+import fcntl
+import io
+import json
+import os
+import time
+
+import torch
+
+from octinet import OctiNet
+
+
+def _write_atomic(path, data):
+    """Writes bytes to a file so readers see either the old or the new contents, never a partial file."""
+    with open(path + ".tmp", "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(path + ".tmp", path)
+
+
+class CheckpointManager:
+    """
+    Directory of numbered model generations. Each generation is a weights file (gen-000042.pth)
+    with a metadata file (gen-000042.json: step, samples seen, Elo, creation time, architecture),
+    both written atomically; LATEST names the newest complete generation. Readers detect a new
+    generation by stat-ing LATEST and load it into their existing model in place.
+    """
+
+    def __init__(self, path="checkpoints", keep=None):
+        self.path = path
+        self.keep = keep  # Generations to keep on disk, None for all
+        self._latest_path = os.path.join(path, "LATEST")
+        self._lock_path = os.path.join(path, "lock")
+        self._latest_stamp = None
+        self._latest = None
+        self.loaded_generation = None  # Last generation loaded through this manager
+
+    def _file(self, generation, extension):
+        return os.path.join(self.path, f"gen-{generation:06d}.{extension}")
+
+    def latest_generation(self):
+        """Returns the newest generation number, or None; re-reads LATEST only when a stat shows it was replaced."""
+        try:
+            stat = os.stat(self._latest_path)
+        except FileNotFoundError:
+            return None
+        stamp = stat.st_ino, stat.st_mtime_ns
+        if stamp != self._latest_stamp:
+            with open(self._latest_path) as latest_file:
+                self._latest = int(latest_file.read())
+            self._latest_stamp = stamp
+        return self._latest
+
+    def generations(self):
+        """Returns the numbers of every generation on disk, oldest first."""
+        if not os.path.isdir(self.path):
+            return []
+        names = (name for name in os.listdir(self.path) if name.startswith("gen-") and name.endswith(".json"))
+        return sorted(int(name[4:-5]) for name in names)
+
+    def save(self, model, step=0, samples=0, elo=None, optimizer=None, **extra):
+        """Writes the model (and optimizer state) as a new generation and returns its number."""
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                generation = (self.latest_generation() or 0) + 1
+                state = {"model": model.state_dict()}
+                if optimizer is not None:
+                    state["optimizer"] = optimizer.state_dict()
+                weights = io.BytesIO()
+                torch.save(state, weights)
+                _write_atomic(self._file(generation, "pth"), weights.getvalue())
+
+                metadata = {"generation": generation, "step": step, "samples": samples, "elo": elo,
+                            "created": time.time(), "input_size": model.input_size,
+                            "policy_head": model.has_policy, **extra}
+                _write_atomic(self._file(generation, "json"), json.dumps(metadata).encode())
+                _write_atomic(self._latest_path, str(generation).encode())
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        if self.keep:
+            self.prune(self.keep)
+        return generation
+
+    def metadata(self, generation=None):
+        """Returns the metadata of a generation (default the latest)."""
+        generation = generation if generation is not None else self.latest_generation()
+        with open(self._file(generation, "json")) as meta_file:
+            return json.load(meta_file)
+
+    def update_metadata(self, generation, **fields):
+        """Adds or changes metadata of an existing generation, e.g. its Elo once it has been rated."""
+        metadata = self.metadata(generation)
+        metadata.update(fields)
+        _write_atomic(self._file(generation, "json"), json.dumps(metadata).encode())
+
+    def load(self, model=None, generation=None, optimizer=None):
+        """
+        Loads a generation (default the latest) into `model` in place, or into a new OctiNet built
+        from its metadata, and into `optimizer` when given. Returns (model, metadata).
+        """
+        metadata = self.metadata(generation)
+        state = torch.load(self._file(metadata["generation"], "pth"))
+        if model is None:
+            model = OctiNet(metadata["input_size"], policy_head=metadata["policy_head"])
+            model.eval()
+        with torch.no_grad():
+            model.load_state_dict(state["model"])
+        if optimizer is not None and "optimizer" in state:
+            optimizer.load_state_dict(state["optimizer"])
+        self.loaded_generation = metadata["generation"]
+        return model, metadata
+
+    def refresh(self, model):
+        """Loads the latest generation into `model` in place if it is newer than the last one loaded; returns whether it did."""
+        generation = self.latest_generation()
+        if generation is None or generation == self.loaded_generation:
+            return False
+        self.load(model, generation)
+        return True
+
+    def prune(self, keep):
+        """Deletes all but the newest `keep` generations."""
+        for generation in self.generations()[:-keep]:
+            for extension in ("pth", "json"):
+                try:
+                    os.remove(self._file(generation, extension))
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,34 @@
+import numpy as np
+
+# Input planes of 64 squares each: player 0 pods, player 1 pods, N, S, E, W prongs, side to move
+NUM_PLANES = 7
+FEATURE_SIZE = NUM_PLANES * 64
+_MASK_BYTES = 6 * 8
+
+# Bits of every byte value, least significant first, so a byte of a bitmask expands to its 8 squares
+_BYTE_BITS = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1, bitorder="little").astype(np.float32)
+
+
+def encode_board(pods, prongs, side_to_move=0, out=None):
+    """
+    Encodes a position's pods and prongs bitmasks as a FEATURE_SIZE float32 vector.
+    Writes straight into `out` (e.g. a row of a batch buffer) when given, without intermediate arrays.
+    """
+    if out is None:
+        out = np.empty(FEATURE_SIZE, dtype=np.float32)
+    mask_bytes = np.frombuffer(
+        b"".join(mask.to_bytes(8, "little") for mask in (pods[0], pods[1], prongs[0], prongs[1], prongs[2], prongs[3])),
+        dtype=np.uint8,
+    )
+    np.take(_BYTE_BITS, mask_bytes, axis=0, out=out[:_MASK_BYTES * 8].reshape(_MASK_BYTES, 8), mode="clip")
+    out[_MASK_BYTES * 8:] = side_to_move
+    return out
+
+
+def encode_games(games, out=None):
+    """Encodes the current positions of several games into the rows of a (len(games), FEATURE_SIZE) buffer."""
+    if out is None:
+        out = np.empty((len(games), FEATURE_SIZE), dtype=np.float32)
+    for row, game in enumerate(games):
+        game.board.to_vector(game.current_player_index, out=out[row])
+    return out
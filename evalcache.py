@@ -0,0 +1,132 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from evaluator import terminal_value
+
+
+class CachedEvaluator:
+    """
+    Memoizes another evaluator's scores by position hash with LRU eviction.
+    The cache empties itself whenever the wrapped evaluator reports new weights (for a local
+    model, any in-place update such as an optimizer step or load_state_dict), so one instance
+    can safely be shared by both AI players of a self-play game. When the wrapped evaluator has a
+    policy head, batches also cache the policy logits (as float16, about 1.5 KB per position), so
+    MCTS priors are served from the cache too.
+    """
+
+    def __init__(self, evaluator, capacity=200_000):
+        self.evaluator = evaluator
+        self.capacity = capacity
+        self.cache = OrderedDict()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+        self._weights_version = evaluator.weights_version()
+        self._row_keys = []  # Hash of each encoded row, None for a cache hit
+        self._row_values = []
+        self._queued_misses = 0
+
+    @property
+    def has_policy(self):
+        return getattr(self.evaluator, "has_policy", False)
+
+    @property
+    def evaluations(self):
+        return self.evaluator.evaluations
+
+    @property
+    def forward_passes(self):
+        return self.evaluator.forward_passes
+
+    def _check_weights(self):
+        version = self.evaluator.weights_version()
+        if version != self._weights_version:
+            self._weights_version = version
+            self.cache.clear()
+            self.invalidations += 1
+
+    def _lookup(self, key, need_logits=False):
+        """Returns a cached score, or (score, logits) for positions evaluated with the policy head."""
+        entry = self.cache.get(key)
+        if entry is None or (need_logits and not isinstance(entry, tuple)):
+            self.misses += 1
+            return None
+        self.cache.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def _store(self, key, value):
+        self.cache[key] = value
+        if len(self.cache) > self.capacity:
+            self.cache.popitem(last=False)
+            self.evictions += 1
+
+    def evaluate(self, game):
+        """Evaluates a single position, from the cache when possible."""
+        if game.winner:
+            return terminal_value(game)
+        self._check_weights()
+        key = game.hash
+        entry = self._lookup(key)
+        if entry is None:
+            entry = self.evaluator.evaluate(game)
+            self._store(key, entry)
+        return entry[0] if isinstance(entry, tuple) else entry
+
+    def encode(self, game, row):
+        """Queues row `row` of a batch; only cache misses are written to the wrapped evaluator's buffer."""
+        if row == 0:
+            self._check_weights()
+            self._row_keys.clear()
+            self._row_values.clear()
+            self._queued_misses = 0
+        key = game.hash
+        value = self._lookup(key, self.has_policy)
+        if value is None:
+            self.evaluator.encode(game, self._queued_misses)
+            self._queued_misses += 1
+            self._row_keys.append(key)
+            self._row_values.append(0.0)
+        else:
+            self._row_keys.append(None)
+            self._row_values.append(value)
+
+    def _evaluate_rows(self, count):
+        """Returns the cache entries of the `count` queued rows, evaluating the misses in one forward pass."""
+        keys, entries = self._row_keys[:count], self._row_values[:count]
+        missed = [i for i, key in enumerate(keys) if key is not None]
+        if not missed:
+            results = []
+        elif self.has_policy:
+            scores, logits = self.evaluator.evaluate_policy_buffer(len(missed))
+            results = [(score, row.astype(np.float16)) for score, row in zip(scores, logits)]
+        else:
+            results = self.evaluator.evaluate_buffer(len(missed))
+        for i, entry in zip(missed, results):
+            entries[i] = entry
+            self._store(keys[i], entry)
+        self._row_keys.clear()
+        self._row_values.clear()
+        return entries
+
+    def evaluate_buffer(self, count):
+        """Returns the scores of the `count` queued rows, evaluating the misses in one forward pass."""
+        return [entry[0] if isinstance(entry, tuple) else entry for entry in self._evaluate_rows(count)]
+
+    def evaluate_policy_buffer(self, count):
+        """Like evaluate_buffer for a wrapped evaluator with a policy head; also returns the rows' logits."""
+        entries = self._evaluate_rows(count)
+        logits = np.stack([entry[1] for entry in entries]).astype(np.float32) if entries else None
+        return [entry[0] for entry in entries], logits
+
+    def stats(self):
+        """Returns the cache's size and hit/miss/eviction/invalidation counters."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.cache),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,68 @@
+import numpy as np
+import torch
+
+
+def terminal_value(game):
+    """Returns the exact value of a finished game from player 0's side: +1 win, -1 loss, 0 draw."""
+    if game.winner == "DRAW":
+        return 0.0
+    return 1.0 if game.winner is game.players[0] else -1.0
+
+
+class ModelEvaluator:
+    """
+    Evaluates positions with an OctiNet, either one at a time or as a batch
+    of rows collected into a preallocated input buffer.
+    """
+
+    def __init__(self, model, batch_size=256):
+        self.model = model
+        self.input_size = model.input_size
+        self.buffer = np.zeros((batch_size, self.input_size), dtype=np.float32)
+        self.evaluations = 0
+        self.forward_passes = 0
+
+    @property
+    def has_policy(self):
+        return self.model.has_policy
+
+    def weights_version(self):
+        """Changes whenever the model's weights are updated in place (optimizer steps, load_state_dict)."""
+        return tuple(parameter._version for parameter in self.model.parameters())
+
+    def evaluate(self, game):
+        """Evaluates a single position with one forward pass."""
+        if game.winner:
+            return terminal_value(game)
+        board_state = game.board.to_vector(game.current_player_index)  # Convert board to numeric format
+        with torch.no_grad():
+            score = self.model(torch.from_numpy(board_state)[None])  # Quantized layers need a batch dimension
+        self.evaluations += 1
+        self.forward_passes += 1
+        return score.item()
+
+    def encode(self, game, row):
+        """Writes a position into row `row` of the input buffer, growing the buffer if needed."""
+        if row >= len(self.buffer):
+            grown = np.zeros((2 * len(self.buffer), self.input_size), dtype=np.float32)
+            grown[:len(self.buffer)] = self.buffer
+            self.buffer = grown
+        game.board.to_vector(game.current_player_index, out=self.buffer[row])
+
+    def evaluate_buffer(self, count):
+        """Evaluates the first `count` buffer rows in one forward pass and returns their scores."""
+        if count == 0:
+            return []
+        with torch.no_grad():
+            scores = self.model(torch.from_numpy(self.buffer[:count]))
+        self.evaluations += count
+        self.forward_passes += 1
+        return scores.view(-1).tolist()
+
+    def evaluate_policy_buffer(self, count):
+        """Like evaluate_buffer for a model with a policy head; also returns the rows' policy logits as an array."""
+        with torch.no_grad():
+            scores, logits = self.model.forward_policy(torch.from_numpy(self.buffer[:count]))
+        self.evaluations += count
+        self.forward_passes += 1
+        return scores.view(-1).tolist(), logits.numpy()
@@ -0,0 +1,256 @@
+import fcntl
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from bitboard import BitBoard
+from encoding import FEATURE_SIZE
+from move import (ACTIONS_PER_SQUARE, HOPS_SHIFT, JUMP_MOVES, MAX_EXTRA_HOPS, NUM_ACTIONS, PATH_SHIFT, PRONG_MOVES,
+                  STEP_MOVES, extend_jump, move_action)
+from octigame import OctiGame
+from player import Player
+
+# File layout: MAGIC, then one record per game:
+#   varint  length of the rest of the record in bytes
+#   u8      flags (HAS_VALUES, HAS_NODES, HAS_POLICIES)
+#   i8      outcome from player 0's side (+1 win, -1 loss, 0 draw)
+#   varint  max_moves of the game (its draw limit), then varint number of moves
+#   varint  move code per move: move_action(move) + NUM_ACTIONS * (move >> HOPS_SHIFT), i.e. the policy
+#           action plus the extra hops of a jump chain; 2 bytes for any single-hop move
+#   f16     search value per move, for the side that played it (with HAS_VALUES)
+#   varint  search nodes per move (with HAS_NODES)
+#   per move (with HAS_POLICIES): varint k, then k (varint action, varint visits) pairs: the visit
+#           counts of the root's children by policy action, k = 0 for a move played without a search
+# The to square follows from the rest, so a typical game takes about 2 bytes per move plus 5.
+MAGIC = b"OCTR\x01"
+HAS_VALUES, HAS_NODES, HAS_POLICIES = 1, 2, 4
+
+GameRecord = namedtuple("GameRecord", ["moves", "outcome", "values", "nodes", "max_moves", "policies"],
+                        defaults=(None, None, 100, None))
+GameRecord.__doc__ = """
+One finished game: its packed moves, the outcome from player 0's side and, optionally, the search
+value (for the side to move) and node count of every move, as float32 and int64 arrays, and the
+root visit counts of every move as {policy action: visits} dicts (empty for unsearched moves).
+"""
+
+_MOVE_TABLES = (STEP_MOVES, JUMP_MOVES, PRONG_MOVES)
+
+
+def encode_move(move):
+    """Returns the record code of a packed move."""
+    return move_action(move) + NUM_ACTIONS * (move >> HOPS_SHIFT)
+
+
+def decode_move(code):
+    """Returns the packed move of a record code."""
+    action, chain = code % NUM_ACTIONS, code // NUM_ACTIONS
+    square, rest = divmod(action, ACTIONS_PER_SQUARE)
+    kind, direction = divmod(rest, 4)  # As laid out by move_action
+    move = _MOVE_TABLES[kind][square][direction]
+    for hop in range(chain & MAX_EXTRA_HOPS):
+        move = extend_jump(move, chain >> (PATH_SHIFT - HOPS_SHIFT + 2 * hop) & 3)
+    return move
+
+
+def _append_varint(out, value):
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    """Returns (value, position after it)."""
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def encode_record(record):
+    """Returns the bytes of one game record, length prefix included."""
+    body = bytearray()
+    body.append((HAS_VALUES if record.values is not None else 0) | (HAS_NODES if record.nodes is not None else 0)
+                | (HAS_POLICIES if record.policies is not None else 0))
+    body.append(int(record.outcome) & 0xFF)
+    _append_varint(body, record.max_moves)
+    _append_varint(body, len(record.moves))
+    for move in record.moves:
+        _append_varint(body, encode_move(move))
+    if record.values is not None:
+        body += np.asarray(record.values, dtype="<f2").tobytes()
+    if record.nodes is not None:
+        for nodes in record.nodes:
+            _append_varint(body, int(nodes))
+    if record.policies is not None:
+        for policy in record.policies:
+            _append_varint(body, len(policy))
+            for action, visits in sorted(policy.items()):
+                _append_varint(body, int(action))
+                _append_varint(body, int(visits))
+
+    out = bytearray()
+    _append_varint(out, len(body))
+    return out + body
+
+
+def decode_record(data, pos=0):
+    """Decodes the record body starting at `pos` of a bytes-like object (after its length prefix)."""
+    flags, outcome = data[pos], data[pos + 1]
+    max_moves, pos = _read_varint(data, pos + 2)
+    count, pos = _read_varint(data, pos)
+    moves = []
+    for _ in range(count):
+        code, pos = _read_varint(data, pos)
+        moves.append(decode_move(code))
+    values = nodes = policies = None
+    if flags & HAS_VALUES:
+        values = np.frombuffer(data, dtype="<f2", count=count, offset=pos).astype(np.float32)
+        pos += 2 * count
+    if flags & HAS_NODES:
+        nodes = np.empty(count, dtype=np.int64)
+        for i in range(count):
+            nodes[i], pos = _read_varint(data, pos)
+    if flags & HAS_POLICIES:
+        policies = []
+        for _ in range(count):
+            size, pos = _read_varint(data, pos)
+            policy = {}
+            for _ in range(size):
+                action, pos = _read_varint(data, pos)
+                policy[action], pos = _read_varint(data, pos)
+            policies.append(policy)
+    return GameRecord(moves, outcome - 256 if outcome > 127 else outcome, values, nodes, max_moves, policies)
+
+
+class GameRecordWriter:
+    """
+    Append-only writer of game records. Records are buffered in memory and appended with one
+    O_APPEND write under a file lock per flush, so several processes can share a file without
+    interleaving records. Use it as a context manager or call close() to write the last ones.
+    """
+
+    def __init__(self, path, buffer_bytes=1 << 20):
+        self.path = path
+        self.buffer_bytes = buffer_bytes
+        self.buffer = bytearray()
+        self.games = 0
+
+    def append(self, record):
+        self.buffer += encode_record(record)
+        self.games += 1
+        if len(self.buffer) >= self.buffer_bytes:
+            self.flush()
+
+    def append_game(self, moves, outcome, values=None, nodes=None, max_moves=100, policies=None):
+        self.append(GameRecord(list(moves), outcome, values, nodes, max_moves, policies))
+
+    def flush(self):
+        if not self.buffer:
+            return
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            data = self.buffer if os.fstat(fd).st_size else MAGIC + self.buffer
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)  # Releases the lock
+        self.buffer = bytearray()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_games(path, chunk_bytes=1 << 20):
+    """
+    Yields the GameRecords of a file in order, reading it `chunk_bytes` at a time so files far
+    larger than memory can be streamed. A record cut short by a writer that died is ignored.
+    """
+    with open(path, "rb") as record_file:
+        if record_file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a game record file: {path}")
+        data, pos = b"", 0
+        while True:
+            chunk = record_file.read(chunk_bytes)
+            data = data[pos:] + chunk
+            pos = 0
+            while pos < len(data):
+                if not any(byte < 0x80 for byte in data[pos:pos + 10]):
+                    break  # Length prefix incomplete
+                length, start = _read_varint(data, pos)
+                if start + length > len(data):
+                    break
+                yield decode_record(data, start)
+                pos = start + length
+            if not chunk:
+                return
+
+
+def _new_game(record, board_class):
+    return OctiGame(Player(0), Player(1), board_class(), max_moves=record.max_moves, observer=None)
+
+
+def replay_positions(record, board_class=BitBoard):
+    """Yields (game, move) for every move of a record, with the headless game in the position before it."""
+    game = _new_game(record, board_class)
+    for move in record.moves:
+        yield game, move
+        game.moves.append(move)
+        game.make_move(move)
+
+
+def replay_game(record, board_class=BitBoard):
+    """Returns the headless game of a record, played through to its end."""
+    game = _new_game(record, board_class)
+    for move in record.moves:
+        game.moves.append(move)
+        game.make_move(move)
+    return game
+
+
+def training_positions(records, search_weight=0.0):
+    """
+    Yields (states, value targets, policy targets) per game of an iterable of records, encoded as in
+    self-play. Value targets are the outcome from player 0's side, mixed with the recorded search
+    values by `search_weight` when a record has them. Policy targets are the root visit distributions
+    over NUM_ACTIONS (all zero for unsearched moves), or None for a record without them.
+    """
+    for record in records:
+        states = np.empty((len(record.moves), FEATURE_SIZE), dtype=np.float32)
+        for ply, (game, _) in enumerate(replay_positions(record)):
+            game.board.to_vector(game.current_player_index, out=states[ply])
+        targets = np.full(len(states), record.outcome, dtype=np.float32)
+        if search_weight and record.values is not None:
+            side = np.where(np.arange(len(states)) % 2 == 0, 1.0, -1.0)  # Player 0 moves on even plies
+            targets = (1 - search_weight) * targets + search_weight * side * record.values
+        policies = None
+        if record.policies is not None:
+            policies = np.zeros((len(states), NUM_ACTIONS), dtype=np.float32)
+            for ply, policy in enumerate(record.policies):
+                for action, visits in policy.items():
+                    policies[ply, action] = visits
+            totals = policies.sum(axis=1, keepdims=True)
+            np.divide(policies, totals, out=policies, where=totals > 0)
+        yield states, targets, policies
+
+
+def fill_buffer(buffer, records, search_weight=0.0):
+    """Appends the training positions of every record to a ReplayBuffer and returns the number of games."""
+    games = 0
+    for states, targets, policies in training_positions(records, search_weight):
+        buffer.append_game(states, targets, policies)
+        games += 1
+    return games
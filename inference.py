@@ -0,0 +1,231 @@
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import torch
+import torch.multiprocessing as multiprocessing
+
+from evaluator import terminal_value
+from octinet import OctiNet
+
+
+def _serve(state_dict, input_size, input_memory, output_memory, num_clients, slot_rows, request_queue,
+           control_queue, ready, weights_version, generation, evaluations, batches, stop_event, max_batch,
+           max_latency):
+    """Inference process: batches requests across clients up to max_batch rows or max_latency seconds."""
+    model = OctiNet(input_size, policy_head="policy.weight" in state_dict)
+    model.load_state_dict(state_dict)
+    model.eval()
+    output_size = 1 + (model.policy.out_features if model.has_policy else 0)  # Score, then policy logits
+    inputs = np.ndarray((num_clients, slot_rows, input_size), dtype=np.float32, buffer=input_memory.buf)
+    outputs = np.ndarray((num_clients, slot_rows, output_size), dtype=np.float32, buffer=output_memory.buf)
+    batch = np.empty((max_batch + slot_rows, input_size), dtype=np.float32)
+
+    while not stop_event.is_set():
+        try:
+            while True:  # Hot-swap weights between batches
+                published, published_generation = control_queue.get_nowait()
+                model.load_state_dict(published)
+                with weights_version.get_lock():  # Clients read the version and generation together
+                    weights_version.value += 1
+                    generation.value = published_generation
+        except queue.Empty:
+            pass
+
+        try:
+            pending = [request_queue.get(timeout=0.1)]
+        except queue.Empty:
+            continue
+        rows = pending[0][1]
+        deadline = time.perf_counter() + max_latency
+        # Clients block on their request, so once every client is pending no more rows can arrive
+        while rows < max_batch and len(pending) < num_clients:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = request_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(request)
+            rows += request[1]
+
+        offset = 0
+        for client, count in pending:
+            batch[offset:offset + count] = inputs[client, :count]
+            offset += count
+        with torch.no_grad():
+            if model.has_policy:
+                scores, logits = model.forward_policy(torch.from_numpy(batch[:offset]))
+                logits = logits.numpy()
+            else:
+                scores = model(torch.from_numpy(batch[:offset]))
+            scores = scores.view(-1).numpy()
+
+        offset = 0
+        for client, count in pending:
+            outputs[client, :count, 0] = scores[offset:offset + count]
+            if model.has_policy:
+                outputs[client, :count, 1:] = logits[offset:offset + count]
+            offset += count
+            ready[client].set()
+        evaluations.value += offset
+        batches.value += 1
+
+    input_memory.close()
+    output_memory.close()
+
+
+class InferenceServer:
+    """
+    Process owning the OctiNet used by all self-play workers. Each client has a slot of
+    `slot_rows` positions in shared memory; the server gathers requests from all clients into
+    batches of up to `max_batch` rows, waiting at most `max_latency_ms` for a batch to fill.
+    A model with a policy head also returns each position's policy logits to its client.
+    """
+
+    def __init__(self, model, num_clients, max_batch=1024, max_latency_ms=2.0, slot_rows=512):
+        self.num_clients = num_clients
+        self.slot_rows = slot_rows
+        self.input_size = model.input_size
+        self.output_size = 1 + (model.policy.out_features if model.has_policy else 0)
+        self.input_memory = shared_memory.SharedMemory(create=True, size=num_clients * slot_rows * self.input_size * 4)
+        self.output_memory = shared_memory.SharedMemory(create=True,
+                                                        size=num_clients * slot_rows * self.output_size * 4)
+        self.request_queue = multiprocessing.Queue()
+        self.control_queue = multiprocessing.Queue()
+        self.ready = [multiprocessing.Event() for _ in range(num_clients)]
+        self.weights_version = multiprocessing.Value("l", 0)
+        self.generation = multiprocessing.Value("l", -1)  # Checkpoint generation of the weights being served
+        self.evaluations = multiprocessing.Value("q", 0)
+        self.batches = multiprocessing.Value("q", 0)
+        self.stop_event = multiprocessing.Event()
+        self.started = time.perf_counter()
+
+        self.process = multiprocessing.Process(
+            target=_serve,
+            args=(model.state_dict(), self.input_size, self.input_memory, self.output_memory, num_clients, slot_rows,
+                  self.request_queue, self.control_queue, self.ready, self.weights_version, self.generation,
+                  self.evaluations, self.batches, self.stop_event, max_batch, max_latency_ms / 1000),
+            daemon=True,
+        )
+        self.process.start()
+
+    def client(self, client_id):
+        """Returns the evaluator a worker process uses to talk to this server."""
+        return InferenceClient(client_id, self)
+
+    def publish(self, model, generation=-1):
+        """
+        Hot-swaps the served weights, labelled with their checkpoint generation; clients' caches are
+        invalidated once the server applies them.
+        """
+        self.control_queue.put(({name: tensor.clone() for name, tensor in model.state_dict().items()}, generation))
+
+    def report(self):
+        """Prints the total evaluations/sec and the average batch size served so far."""
+        elapsed = time.perf_counter() - self.started
+        evaluations, batches = self.evaluations.value, self.batches.value
+        print(f"inference server: {evaluations / elapsed:,.0f} evals/s, "
+              f"{evaluations / max(batches, 1):.1f} positions per batch")
+
+    def close(self):
+        self.stop_event.set()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        for memory in (self.input_memory, self.output_memory):
+            memory.close()
+            memory.unlink()
+
+
+class InferenceClient:
+    """Evaluator (same interface as ModelEvaluator) that sends positions to an InferenceServer."""
+
+    def __init__(self, client_id, server):
+        self.client_id = client_id
+        self.slot_rows = server.slot_rows
+        self.input_size = server.input_size
+        self.output_size = server.output_size
+        self.num_clients = server.num_clients
+        self.input_memory = server.input_memory
+        self.output_memory = server.output_memory
+        self.request_queue = server.request_queue
+        self.ready = server.ready[client_id]
+        self.shared_weights_version = server.weights_version
+        self.shared_generation = server.generation
+        self.evaluations = 0
+        self.forward_passes = 0
+        self._inputs = self._outputs = None
+        self._overflow = np.empty((0, self.input_size), dtype=np.float32)
+
+    def _attach(self):
+        inputs = np.ndarray((self.num_clients, self.slot_rows, self.input_size), dtype=np.float32,
+                            buffer=self.input_memory.buf)
+        outputs = np.ndarray((self.num_clients, self.slot_rows, self.output_size), dtype=np.float32,
+                             buffer=self.output_memory.buf)
+        self._inputs, self._outputs = inputs[self.client_id], outputs[self.client_id]
+
+    @property
+    def has_policy(self):
+        return self.output_size > 1
+
+    def weights_version(self):
+        return self.shared_weights_version.value
+
+    def served_weights(self):
+        """Returns (weights version, checkpoint generation) of the weights the server is applying now."""
+        with self.shared_weights_version.get_lock():
+            return self.shared_weights_version.value, self.shared_generation.value
+
+    def evaluate(self, game):
+        """Evaluates a single position through the server."""
+        if game.winner:
+            return terminal_value(game)
+        self.encode(game, 0)
+        return self.evaluate_buffer(1)[0]
+
+    def encode(self, game, row):
+        """Writes a position straight into this client's shared-memory slot (or a local overflow buffer)."""
+        if self._inputs is None:
+            self._attach()
+        if row < self.slot_rows:
+            game.board.to_vector(game.current_player_index, out=self._inputs[row])
+            return
+        row -= self.slot_rows
+        if row >= len(self._overflow):
+            grown = np.empty((max(2 * len(self._overflow), self.slot_rows), self.input_size), dtype=np.float32)
+            grown[:len(self._overflow)] = self._overflow
+            self._overflow = grown
+        game.board.to_vector(game.current_player_index, out=self._overflow[row])
+
+    def _evaluate_rows(self, count):
+        """Returns the server's output rows (score, then any logits) of the first `count` encoded rows."""
+        rows = [self._request(min(count, self.slot_rows))]
+        for start in range(0, count - self.slot_rows, self.slot_rows):
+            chunk = min(self.slot_rows, count - self.slot_rows - start)
+            self._inputs[:chunk] = self._overflow[start:start + chunk]
+            rows.append(self._request(chunk))
+        return np.concatenate(rows)
+
+    def evaluate_buffer(self, count):
+        """Evaluates the first `count` encoded rows, one server request per slot-sized chunk."""
+        return self._evaluate_rows(count)[:, 0].tolist()
+
+    def evaluate_policy_buffer(self, count):
+        """Like evaluate_buffer with a policy-head model on the server; also returns the rows' logits."""
+        rows = self._evaluate_rows(count)
+        return rows[:, 0].tolist(), rows[:, 1:]
+
+    def _request(self, count):
+        if count == 0:
+            return np.empty((0, self.output_size), dtype=np.float32)
+        if self._outputs is None:
+            self._attach()
+        self.ready.clear()
+        self.request_queue.put((self.client_id, count))
+        self.ready.wait()
+        self.evaluations += count
+        self.forward_passes += 1
+        return self._outputs[:count].copy()
@@ -1,46 +1,145 @@
-from octigame import OctiGame
-from octigamegui import OctiGameGUI
-from octinet import OctiNet
-from player import Player
-from rltrainer import RLTrainer
-
-
-class Main:
-
-    def __init__(self):
-        self.trainer = RLTrainer(OctiNet())
-
-    def run(self):
-        print("Welcome to Octi AI!")
-        print("1: Train AI")
-        print("2: Play against AI")
-        print("3: Play Human vs Human")
-        choice = str(3) # input("Select an option (1-3): ").strip()
-
-        if choice == "1":
-            self.train_ai()
-        elif choice == "2":
-            self.play_vs_ai()
-        elif choice == "3":
-            self.play_human_vs_human()
-        else:
-            print("Invalid choice. Exiting...")
-
-    def train_ai(self):
-        epochs = int(input("Enter number of training epochs: ").strip())
-        print(f"Training AI for {epochs} epochs...")
-        self.trainer.train(epochs=epochs)
-        print("Training complete!")
-
-    def play_vs_ai(self):
+import argparse
+import sys
+
+# Every command imports what it needs when it runs, so e.g. a Human vs Human game never loads torch.
+# --imports-only stops a command once its modules are loaded, for bench.py's startup benchmark.
+
+
+def play(args):
+    """Opens the game window, Human vs Human or, with --ai, against the latest checkpoint."""
+    if args.ai:
+        from octinet import OctiNet
+        from rltrainer import RLTrainer
+        if args.imports_only:
+            return
         print("Starting Human vs AI game...")
-        self.trainer.play_vs_human()
+        RLTrainer(OctiNet()).play_vs_human(args.depth, args.time_ms, args.checkpoints)
+        return
+
+    from octigame import OctiGame
+    from octigamegui import OctiGameGUI
+    from player import Player
+    if args.imports_only:
+        return
+    print("Starting Human vs Human game...")
+    OctiGameGUI(OctiGame(Player(0), Player(1))).run()
+
+
+def train(args):
+    """Trains the model in-process from sequential self-play games."""
+    from octinet import OctiNet
+    from rltrainer import RLTrainer
+    if args.imports_only:
+        return
+    print(f"Training AI for {args.epochs} epochs...")
+    RLTrainer(OctiNet()).train(epochs=args.epochs, games_per_epoch=args.games, depth=args.depth,
+                               checkpoint_dir=args.checkpoints, record_path=args.records)
+    print("Training complete!")
+
+
+def selfplay(args):
+    """Trains the model from a pool of self-play worker processes."""
+    from player_training import run_parallel_training
+    if args.imports_only:
+        return
+    run_parallel_training(args.workers, args.rounds, use_inference_server=args.inference_server,
+                          compiled=args.compiled, checkpoint_dir=args.checkpoints, book_path=args.book,
+                          tablebase_path=args.tablebase, record_path=args.records)
+
+
+def tablebase(args):
+    """Solves the endgame tablebase offline."""
+    from tablebase import build_tablebase
+    if args.imports_only:
+        return
+    build_tablebase(args.path, args.max_pods, args.max_prongs)
+
+
+def records(args):
+    """Rebuilds a replay buffer and/or an opening book from a game-record file, without self-play."""
+    from gamerecord import fill_buffer, read_games
+    from openingbook import build_book
+    from replaybuffer import ReplayBuffer
+    if args.imports_only:
+        return
+    if args.buffer:
+        games = fill_buffer(ReplayBuffer(args.buffer), read_games(args.path), args.search_weight)
+        print(f"Appended {games} games to {args.buffer}")
+    if args.book:
+        entries = build_book(((record.moves, record.outcome) for record in read_games(args.path)), args.book)
+        print(f"Wrote {entries} book entries to {args.book}")
+
+
+def benchmark(args):
+    """Runs one of bench.py's benchmarks."""
+    import bench
+    if args.imports_only:
+        return
+    bench.main(["bench.py", args.name, *args.bench_args])
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Octi AI")
+    parser.add_argument("--imports-only", action="store_true", help=argparse.SUPPRESS)
+    commands = parser.add_subparsers(dest="command")
+
+    play_parser = commands.add_parser("play", help="play in the game window (default)")
+    play_parser.add_argument("--ai", action="store_true", help="play against the AI instead of a second human")
+    play_parser.add_argument("--depth", type=int, default=3, help="AI search depth")
+    play_parser.add_argument("--time-ms", type=int, default=2000, help="AI time per move")
+    play_parser.set_defaults(handler=play)
+
+    train_parser = commands.add_parser("train", help="train from sequential self-play")
+    train_parser.add_argument("--epochs", type=int, default=10)
+    train_parser.add_argument("--games", type=int, default=20, help="self-play games per epoch")
+    train_parser.add_argument("--depth", type=int, default=2, help="self-play search depth")
+    train_parser.set_defaults(handler=train)
+
+    selfplay_parser = commands.add_parser("selfplay", help="train from parallel self-play workers")
+    selfplay_parser.add_argument("--workers", type=int, default=4)
+    selfplay_parser.add_argument("--rounds", type=int, default=500, help="games per worker")
+    selfplay_parser.add_argument("--inference-server", action="store_true",
+                                 help="evaluate positions for all workers in one batched server")
+    selfplay_parser.add_argument("--compiled", choices=("script", "quantized"),
+                                 help="evaluate with a TorchScript or int8 quantized model")
+    selfplay_parser.add_argument("--book", help="opening book file to vary the self-play openings")
+    selfplay_parser.add_argument("--tablebase", help="endgame tablebase directory to score and end solved games")
+    selfplay_parser.set_defaults(handler=selfplay)
+
+    for command_parser in (play_parser, train_parser, selfplay_parser):
+        command_parser.add_argument("--checkpoints", default="checkpoints", help="checkpoint directory")
+    for command_parser in (train_parser, selfplay_parser):
+        command_parser.add_argument("--records", help="game-record file to append every self-play game to")
+
+    tablebase_parser = commands.add_parser("tablebase", help="solve the endgame tablebase")
+    tablebase_parser.add_argument("--path", default="tablebase", help="table directory")
+    tablebase_parser.add_argument("--max-pods", type=int, default=2, help="most pods on the board, both sides")
+    tablebase_parser.add_argument("--max-prongs", type=int, help="most prongs on the board (default: all)")
+    tablebase_parser.set_defaults(handler=tablebase)
+
+    records_parser = commands.add_parser("records", help="rebuild training data from a game-record file")
+    records_parser.add_argument("path", help="game-record file")
+    records_parser.add_argument("--buffer", help="replay buffer directory to append the positions to")
+    records_parser.add_argument("--book", help="opening book file to build")
+    records_parser.add_argument("--search-weight", type=float, default=0.0,
+                                help="weight of the recorded search values in the value targets")
+    records_parser.set_defaults(handler=records)
+
+    bench_parser = commands.add_parser("bench", help="run a benchmark of bench.py")
+    bench_parser.add_argument("name", nargs="?", default="perft")
+    bench_parser.add_argument("bench_args", nargs="*")
+    bench_parser.set_defaults(handler=benchmark)
+    return parser
+
 
-    def play_human_vs_human(self):
-        print("Starting Human vs Human game...")
-        OctiGameGUI(OctiGame(Player(0), Player(1))).run()
+def main(argv):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:  # No command: Human vs Human, as before
+        args = parser.parse_args(argv + ["play"])
+    print("Welcome to Octi AI!")
+    args.handler(args)
 
 
 if __name__ == "__main__":
-    main = Main()
-    main.run()
+    main(sys.argv[1:])
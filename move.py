@@ -0,0 +1,161 @@
+# Moves are packed ints:
+#   bits 0-5    from square (row * 8 + col)
+#   bits 6-11   to square
+#   bits 12-13  kind (STEP, JUMP, PRONG)
+#   bits 14-15  direction index (N, S, E, W) of the first hop
+#   bits 16-19  number of extra hops in a multi-jump chain
+#   bits 20+    direction of each extra hop, 2 bits each
+# The tables below are built once at import, so the engine and the search never touch move strings.
+from board import DIRECTION_ORDER
+
+STEP, JUMP, PRONG = range(3)
+KIND_NAMES = ("step", "jump", "prong")
+
+BOARD_SIZE = 8
+NUM_SQUARES = BOARD_SIZE * BOARD_SIZE
+# (d_row, d_col) per direction index, matching DIRECTION_ORDER
+DIRECTION_DELTAS = ((-1, 0), (1, 0), (0, 1), (0, -1))
+
+FROM_MASK = 0x3F
+TO_SHIFT, KIND_SHIFT, DIRECTION_SHIFT, HOPS_SHIFT, PATH_SHIFT = 6, 12, 14, 16, 20
+MAX_EXTRA_HOPS = 15
+
+
+def encode(kind, start, end, direction):
+    """Packs a move into an int."""
+    return start | end << TO_SHIFT | kind << KIND_SHIFT | direction << DIRECTION_SHIFT
+
+
+def move_from(move):
+    return move & FROM_MASK
+
+
+def move_to(move):
+    return move >> TO_SHIFT & FROM_MASK
+
+
+def move_kind(move):
+    return move >> KIND_SHIFT & 3
+
+
+def move_direction(move):
+    return move >> DIRECTION_SHIFT & 3
+
+
+def move_extra_hops(move):
+    return move >> HOPS_SHIFT & 15
+
+
+def move_directions(move):
+    """Returns the direction of every hop of a move, first hop included."""
+    directions = [move_direction(move)]
+    for hop in range(move_extra_hops(move)):
+        directions.append(move >> (PATH_SHIFT + 2 * hop) & 3)
+    return directions
+
+
+def move_path(move):
+    """Returns the squares a move visits, from square included."""
+    path = [move_from(move)]
+    if move_kind(move) == PRONG:
+        return path
+    table = JUMP_TARGET if move_kind(move) == JUMP else NEIGHBOR
+    for direction in move_directions(move):
+        path.append(table[path[-1]][direction])
+    return path
+
+
+def extend_jump(move, direction):
+    """Returns a jump chain continuing a jump move by one more hop in a direction."""
+    hops = move_extra_hops(move)
+    landing = JUMP_TARGET[move_to(move)][direction]
+    return ((move & ~(FROM_MASK << TO_SHIFT) & ~(15 << HOPS_SHIFT)) | landing << TO_SHIFT
+            | (hops + 1) << HOPS_SHIFT | direction << (PATH_SHIFT + 2 * hops))
+
+
+# Fixed action index space for policy targets: from square x (kind, first-hop direction).
+# A multi-jump chain shares the action of its first hop.
+ACTIONS_PER_SQUARE = 12
+NUM_ACTIONS = NUM_SQUARES * ACTIONS_PER_SQUARE
+
+
+def move_action(move):
+    """Returns the policy index of a move, in range(NUM_ACTIONS)."""
+    return (move & FROM_MASK) * ACTIONS_PER_SQUARE + (move >> KIND_SHIFT & 3) * 4 + (move >> DIRECTION_SHIFT & 3)
+
+
+def _offset(square, direction, distance):
+    row, col = divmod(square, BOARD_SIZE)
+    d_row, d_col = DIRECTION_DELTAS[direction]
+    row, col = row + distance * d_row, col + distance * d_col
+    if 0 <= row < BOARD_SIZE and 0 <= col < BOARD_SIZE:
+        return row * BOARD_SIZE + col
+    return -1
+
+
+# NEIGHBOR[square][direction] / JUMP_TARGET[square][direction]: square one / two steps away, or -1 off the board
+NEIGHBOR = tuple(tuple(_offset(square, d, 1) for d in range(4)) for square in range(NUM_SQUARES))
+JUMP_TARGET = tuple(tuple(_offset(square, d, 2) for d in range(4)) for square in range(NUM_SQUARES))
+
+# Every possible move of each kind per square and direction, or None when it would leave the board
+STEP_MOVES = tuple(
+    tuple(encode(STEP, square, NEIGHBOR[square][d], d) if NEIGHBOR[square][d] >= 0 else None for d in range(4))
+    for square in range(NUM_SQUARES)
+)
+JUMP_MOVES = tuple(
+    tuple(encode(JUMP, square, JUMP_TARGET[square][d], d) if JUMP_TARGET[square][d] >= 0 else None for d in range(4))
+    for square in range(NUM_SQUARES)
+)
+PRONG_MOVES = tuple(tuple(encode(PRONG, square, square, d) for d in range(4)) for square in range(NUM_SQUARES))
+
+
+def move_between(start, end):
+    """Returns the step or jump move from one square to another, or None if they are not in line."""
+    for d in range(4):
+        if NEIGHBOR[start][d] == end:
+            return STEP_MOVES[start][d]
+        if JUMP_TARGET[start][d] == end:
+            return JUMP_MOVES[start][d]
+    return None
+
+
+def _parse_position(text):
+    row, col = map(int, text.strip("()").split(","))
+    if not (0 <= row < BOARD_SIZE and 0 <= col < BOARD_SIZE):
+        raise ValueError(f"Position off the board: {text}")
+    return row * BOARD_SIZE + col
+
+
+def _format_position(square):
+    return "({},{})".format(*divmod(square, BOARD_SIZE))
+
+
+def parse_move(text):
+    """
+    Converts a "move (r,c) to (r,c)", "move (r,c) to (r,c) to (r,c) ..." (multi-jump)
+    or "prong (r,c) D" string to a move, raising ValueError if malformed.
+    """
+    parts = text.replace(", ", ",").split()
+    if len(parts) >= 4 and len(parts) % 2 == 0 and parts[0] == "move" and set(parts[2::2]) == {"to"}:
+        squares = [_parse_position(part) for part in parts[1::2]]
+        move = move_between(squares[0], squares[1])
+        if move is None:
+            raise ValueError(f"Not a straight step or jump: {text}")
+        for square in squares[2:]:
+            if move_kind(move) != JUMP or square not in JUMP_TARGET[move_to(move)] \
+                    or move_extra_hops(move) == MAX_EXTRA_HOPS:
+                raise ValueError(f"Not a chain of jumps: {text}")
+            move = extend_jump(move, JUMP_TARGET[move_to(move)].index(square))
+        return move
+
+    if len(parts) == 3 and parts[0] == "prong" and parts[2] in DIRECTION_ORDER:
+        return PRONG_MOVES[_parse_position(parts[1])][DIRECTION_ORDER.index(parts[2])]
+
+    raise ValueError(f"Unrecognized move: {text}")
+
+
+def format_move(move):
+    """Converts a move to its string form, as shown in logs and the GUI."""
+    if move_kind(move) == PRONG:
+        return f"prong {_format_position(move_from(move))} {DIRECTION_ORDER[move_direction(move)]}"
+    return "move " + " to ".join(_format_position(square) for square in move_path(move))
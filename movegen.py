@@ -0,0 +1,78 @@
+from bitboard import FULL, iter_squares, shift
+from move import (HOPS_SHIFT, JUMP_MOVES, JUMP_TARGET, MAX_EXTRA_HOPS, NEIGHBOR, PRONG_MOVES, STEP_MOVES,
+                  extend_jump)
+
+OPPOSITE = (1, 0, 3, 2)
+
+
+def generate_moves(board, player):
+    """
+    Generates every legal move of a player index: steps, jumps and multi-jump chains
+    (each prefix of a chain is a move of its own, jumps over enemy pods capture) and prong additions.
+    Works on any board exposing the `pods` and `prongs` bitmasks.
+    """
+    own = board.pods[player]
+    occupied = own | board.pods[1 - player]
+    empty = ~occupied & FULL
+    prongs = board.prongs
+    moves = []
+
+    for d in range(4):
+        movers = own & prongs[d]
+        if not movers:
+            continue
+        back = OPPOSITE[d]
+        one_step = shift(movers, d)
+
+        for target in iter_squares(one_step & empty):
+            moves.append(STEP_MOVES[NEIGHBOR[target][back]][d])
+
+        for landing in iter_squares(shift(one_step & occupied, d) & empty):
+            start = JUMP_TARGET[landing][back]
+            move = JUMP_MOVES[start][d]
+            moves.append(move)
+            start_bit = 1 << start
+            pod_directions = [e for e in range(4) if prongs[e] & start_bit]
+            _extend_chains(move, landing, pod_directions, occupied ^ start_bit,
+                           start_bit | 1 << landing, 1 << NEIGHBOR[start][d], moves)
+
+    for d in range(4):
+        for square in iter_squares(own & ~prongs[d]):
+            moves.append(PRONG_MOVES[square][d])
+
+    return moves
+
+
+def _extend_chains(move, square, directions, occupied, visited, jumped, moves):
+    """Adds every continuation of a jump chain ending on a square, never revisiting a landing or re-jumping a pod."""
+    if move >> HOPS_SHIFT & MAX_EXTRA_HOPS == MAX_EXTRA_HOPS:
+        return
+    for d in directions:
+        landing = JUMP_TARGET[square][d]
+        if landing < 0:
+            continue
+        middle = NEIGHBOR[square][d]
+        if not occupied >> middle & 1 or occupied >> landing & 1 or visited >> landing & 1 or jumped >> middle & 1:
+            continue
+        chained = extend_jump(move, d)
+        moves.append(chained)
+        _extend_chains(chained, landing, directions, occupied, visited | 1 << landing, jumped | 1 << middle, moves)
+
+
+def perft(game, depth):
+    """Counts the leaf nodes of the game tree `depth` plies below the current position."""
+    if depth == 0:
+        return 1
+    if game.winner:
+        return 0
+
+    moves = generate_moves(game.board, game.current_player_index)
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        undo = game.make_move(move)
+        nodes += perft(game, depth - 1)
+        game.unmake_move(undo)
+    return nodes
@@ -1,22 +1,46 @@
-from board import Board
+from bitboard import BitBoard
+from move import (DIRECTION_SHIFT, FROM_MASK, HOPS_SHIFT, JUMP, JUMP_TARGET, KIND_SHIFT, MAX_EXTRA_HOPS, NEIGHBOR,
+                  PATH_SHIFT, PRONG, TO_SHIFT, format_move, parse_move)
+from movegen import generate_moves, perft
 from player import Player
+from zobrist import SIDE_KEY
+
+
+def print_observer(event, game, move=None):
+    """Default observer, printing every turn and the result to stdout."""
+    if event == "game_over":
+        print(f"Game over! {game.winner} already won.")
+    elif event == "invalid_move":
+        print("Invalid move, please try again...")
+    elif event == "move":
+        print(game)
+        if game.winner == "DRAW":
+            print("🤝 Game ends in a DRAW.")
+        elif game.winner:
+            print(f"🏆 {game.winner.name} WINS!")
 
 
 class OctiGame:
-    def __init__(self, player1: Player, player2: Player, initial_position=None, max_moves=100):
+    def __init__(self, player1: Player, player2: Player, initial_position=None, max_moves=100,
+                 observer=print_observer):
         self.players = [player1, player2]
+        for index, player in enumerate(self.players):
+            if player.index is None:  # e.g. an OctiAIPlayer created without a seat
+                player.index = index
         self.current_player_index = 0
-        self.board = initial_position if initial_position else Board()
+        self.board = initial_position if initial_position else BitBoard()  # Board is the slower reference backend
         self.winner = None  # Track the winner
-        self.move_log = []  # Store move history
+        self.moves = []  # Packed moves played through play_turn, in order
+        self.ply = 0  # Number of moves played
         self.max_moves = max_moves  # Draw condition
+        self.observer = observer  # Called as observer(event, game, move=...); None runs headless
         self._setup_pods()
 
     def _setup_pods(self):
         """Initial placement of pods."""
         for col in range(4):
-            self.board.place_pod((1, 2+col), self.players[0], {})  # Player 1
-            self.board.place_pod((6, 2+col), self.players[1], {})  # Player 2
+            self.board.place_pod((1, 2+col), self.players[0], [])  # Player 1
+            self.board.place_pod((6, 2+col), self.players[1], [])  # Player 2
 
     def switch_turn(self):
         """Switch turn unless the game is over."""
@@ -24,122 +48,168 @@ class OctiGame:
             self.current_player_index = 1 - self.current_player_index
 
     def play_turn(self, move):
-        """Processes a player's move, logs it, and checks for game end conditions."""
+        """Processes a player's move (packed int or string), logs it, and checks for game end conditions."""
         if self.winner:
-            print(f"Game over! {self.winner} already won.")
+            self._notify("game_over")
             return
 
-        player = self.get_current_player()
-        self.move_log.append((player.index, move))  # Log move
-
-        if move.startswith("move"):
-            _, start, _, end = move.split()
-            start = tuple(map(int, start.strip("()").split(",")))
-            end = tuple(map(int, end.strip("()").split(",")))
-            self.board.move_pod(start, end)
+        if isinstance(move, str):
+            try:
+                move = parse_move(move)
+            except ValueError:
+                move = None
+        if move is None or not self.is_legal_move(move):
+            self._notify("invalid_move", move)
+            return False
 
-            # Check for victory (reaching home row or eliminating opponent)
-            self.check_victory(player, end)
+        self.moves.append(move)  # Log move
+        self.make_move(move)
+        self._notify("move", move)
+
+    def _notify(self, event, move=None):
+        if self.observer is not None:
+            self.observer(event, self, move=move)
+
+    @property
+    def move_log(self):
+        """(player index, move string) for every move played, formatted on demand."""
+        return [(self.players[i % 2].index, format_move(move)) for i, move in enumerate(self.moves)]
+
+    def is_legal_move(self, move):
+        """Returns True if a move is legal for the current player."""
+        return self.winner is None and move in self.get_possible_moves()
+
+    def make_move(self, move):
+        """
+        Applies a legal move in place and returns its undo record:
+        (move, captures, winner, ply, current_player_index), where captures holds
+        square | prongs << 6 for every captured pod, in capture order.
+        """
+        start, end = move & FROM_MASK, move >> TO_SHIFT & FROM_MASK
+        kind, direction = move >> KIND_SHIFT & 3, move >> DIRECTION_SHIFT & 3
+        board = self.board
+        player = self.current_player_index
+
+        captures = ()
+
+        if kind == PRONG:
+            board.set_square(start, player, board.prong_mask(start) | 1 << direction)
+        else:
+            if kind == JUMP:
+                captures = self._jump_captures(move, start, direction, 1 - player)
+            prongs = board.prong_mask(start)
+            board.set_square(start, None, 0)
+            board.set_square(end, player, prongs)
+
+        undo = (move, captures, self.winner, self.ply, player)
+        self.ply += 1
+        if kind != PRONG:
+            self.check_victory(self.players[player], divmod(end, 8))
+        if self.winner is None:
+            self.check_draw()
+        self.switch_turn()
+        return undo
 
-        elif move.startswith("prong"):
-            _, position, direction = move.split()
-            position = tuple(map(int, position.strip("()").split(",")))
-            self.board.add_prong(position, direction)
+    def unmake_move(self, undo):
+        """Reverts the move described by an undo record returned from make_move."""
+        move, captures, winner, ply, player = undo
+        start, end = move & FROM_MASK, move >> TO_SHIFT & FROM_MASK
+        kind, direction = move >> KIND_SHIFT & 3, move >> DIRECTION_SHIFT & 3
+        board = self.board
 
+        if kind == PRONG:
+            board.set_square(start, player, board.prong_mask(start) & ~(1 << direction))
         else:
-            print("Invalid move, please try again...")
-            return False
-
-        print(self)
-        self.check_draw()  # Check if game should end in a draw
-        self.switch_turn()
+            board.set_square(start, player, board.prong_mask(end))
+            board.set_square(end, None, 0)
+            for captured in reversed(captures):
+                board.set_square(captured & 63, 1 - player, captured >> 6)
+
+        self.winner = winner
+        self.ply = ply
+        self.current_player_index = player
+
+    def _jump_captures(self, move, start, direction, opponent):
+        """Captures every enemy pod jumped by a jump chain and returns their packed squares and prong sets."""
+        board = self.board
+        captures = []
+        square, hop, extra_hops = start, 0, move >> HOPS_SHIFT & MAX_EXTRA_HOPS
+        while True:
+            middle = NEIGHBOR[square][direction]
+            if board.owner(middle) == opponent:
+                prongs = board.prong_mask(middle)
+                captures.append(middle | prongs << 6)
+                self._capture(middle, opponent, prongs)
+            square = JUMP_TARGET[square][direction]
+            if hop == extra_hops:
+                return tuple(captures)
+            direction = move >> (PATH_SHIFT + 2 * hop) & 3
+            hop += 1
+
+    def _capture(self, square, owner, prongs):
+        """Removes the last prong (in N, S, E, W order) of a captured pod, and the pod once it has none left."""
+        if prongs:
+            prongs &= ~(1 << (prongs.bit_length() - 1))
+        self.board.set_square(square, owner if prongs else None, prongs)
 
     def get_possible_moves(self):
-        """Generates all legal moves for the current player efficiently."""
-        moves = []
-        player_name = self.players[self.current_player_index].name
-        player_pods = self.board.get_pods(player_name)
-
-        for pod in player_pods:
-            for move in self.get_legal_moves_for_pod(pod):
-                moves.append(move)
-
-        return moves
-
-    def get_legal_moves_for_pod(self, pod):
-        """Generates legal moves for a given pod based on current state."""
-        legal_moves = []
-        row, col, arrows = pod.position, pod.arrows
-
-        # Step 1: Add basic move directions (only if arrows exist)
-        move_directions = self.get_possible_directions(arrows)
-        for direction in move_directions:
-            new_pos = (row + direction[0], col + direction[1])
-            if self.board.is_valid_move(row, col, new_pos):
-                legal_moves.append((row, col, new_pos))
-
-        # Step 2: Capture moves (jump over opponent)
-        for direction in move_directions:
-            jump_pos = (row + 2 * direction[0], col + 2 * direction[1])
-            if self.board.is_valid_capture(row, col, jump_pos):
-                legal_moves.append(("capture", row, col, jump_pos))
-
-        return legal_moves
-
-    def get_possible_directions(self, arrows):
-        """Returns possible move directions based on active arrows."""
-        directions = []
-        if "N" in arrows:
-            directions.append((-1, 0))
-        if "S" in arrows:
-            directions.append((1, 0))
-        if "E" in arrows:
-            directions.append((0, 1))
-        if "W" in arrows:
-            directions.append((0, -1))
-        return directions
+        """Generates all legal moves for the current player."""
+        return generate_moves(self.board, self.current_player_index)
+
+    def perft(self, depth):
+        """Counts the leaf nodes `depth` plies below the current position, for move generation benchmarks."""
+        return perft(self, depth)
 
     def check_victory(self, player, end_pos):
         """Checks if a player has won by reaching home row or eliminating all opponent's pods."""
-        opponent = self.players[1 - self.players.index(player)]
+        player_index = 0 if player is self.players[0] else 1
 
         # Check if the player reached the opponent's home row
-        if (player == self.players[0] and end_pos[0] == 7) or (player == self.players[1] and end_pos[0] == 0):
+        if end_pos[0] == (7 if player_index == 0 else 0):
             self.winner = player
-            print(f"🏆 {player.name} WINS by reaching home row!")
-            return
+            return True
 
         # Check if the opponent has any pods left
-        opponent_has_pods = any(
-            pod and pod["player"] == opponent for pod in self.board.grid.values()
-        )
-
-        if not opponent_has_pods:
+        if self.board.pod_counts[1 - player_index] == 0:
             self.winner = player
-            print(f"🏆 {player.name} WINS by eliminating all opponent pods!")
+            return True
+        return False
 
     def check_draw(self):
         """Checks for a draw condition."""
-        if len(self.move_log) >= self.max_moves:
+        if self.ply >= self.max_moves:
             self.winner = "DRAW"
-            print("🤝 Game ends in a DRAW due to move limit.")
-            return
+            return True
 
         # Check if both players have no valid moves left
         if not self.has_valid_moves(self.players[0]) and not self.has_valid_moves(self.players[1]):
             self.winner = "DRAW"
-            print("🤝 Game ends in a DRAW (no valid moves left).")
+            return True
+        return False
 
     def has_valid_moves(self, player):
         """Returns True if the player has any valid moves left."""
-        for position, pod in self.board.grid.items():
-            if pod and pod["player"] == player:
-                # Check if at least one move is possible
-                for direction in pod["prongs"]:
-                    new_pos = self.board.get_new_position(position, direction)
-                    if new_pos and self.board.is_valid_position(new_pos):
-                        return True
-        return False
+        player_index = 0 if player is self.players[0] else 1
+
+        # A pod can always grow a missing prong; only fully pronged sides need a move search
+        if self.board.free_prongs[player_index]:
+            return True
+        return bool(generate_moves(self.board, player_index))
+
+    @property
+    def hash(self):
+        """Zobrist key of the position including the side to move."""
+        return self.board.hash ^ (SIDE_KEY if self.current_player_index else 0)
+
+    def copy(self):
+        """Returns a headless copy of the position on a BitBoard, e.g. for an AI to search while this game is shown."""
+        game = OctiGame(Player(0), Player(1), BitBoard(), max_moves=self.max_moves, observer=None)
+        for square in range(64):
+            game.board.set_square(square, self.board.owner(square), self.board.prong_mask(square))
+        game.current_player_index = self.current_player_index
+        game.ply = self.ply
+        game.moves = list(self.moves)
+        return game
 
     def get_current_player(self):
         """Returns the current player."""
@@ -1,9 +1,11 @@
-import pygame
 import sys
-import time
+import threading
+
+import pygame
 
 # Constants
-from board import DIRECTIONS
+from board import DIRECTIONS, DIRECTION_ORDER
+from move import NEIGHBOR, PRONG, PRONG_MOVES, move_from, move_kind, move_to
 
 GRID_SIZE = 8
 CELL_SIZE = 80
@@ -16,42 +18,70 @@ PRONG_COLOR = (255, 255, 0)  # Yellow
 TEXT_COLOR = (0, 0, 0)
 HISTORY_BG_COLOR = (240, 240, 240)
 ANIMATION_SPEED = 0.3  # Animation duration in seconds
+FPS = 60  # Frame cap; frames with nothing to redraw only handle events
 
 PANEL_WIDTH = 200
 SCREEN_WIDTH = GRID_SIZE * CELL_SIZE + PANEL_WIDTH
 SCREEN_HEIGHT = GRID_SIZE * CELL_SIZE
 
+BOARD_RECT = pygame.Rect(0, 0, GRID_SIZE * CELL_SIZE, SCREEN_HEIGHT)
+PANEL_RECT = pygame.Rect(GRID_SIZE * CELL_SIZE, 0, PANEL_WIDTH, SCREEN_HEIGHT)
+AI_MOVE_EVENT = pygame.USEREVENT  # Posted by the AI search thread, with the move and the ply it was searched at
+
 
 class OctiGameGUI:
-    def __init__(self, game):
+    """
+    Pygame front end of an OctiGame. AI players search a copy of the game in a background thread
+    and deliver their move as an AI_MOVE_EVENT, so the window keeps handling events meanwhile.
+    The loop is capped at FPS and redraws only the screen areas marked dirty.
+    """
+
+    def __init__(self, game, ai_time_ms=None):
         pygame.init()
         self.game = game
+        self.ai_time_ms = ai_time_ms  # Per-move search budget of AI players, None for their fixed depth
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Octi Game")
+        self.clock = pygame.time.Clock()
         self.selected_pod = None
         self.prong_options = []  # Stores possible prong addition positions
         self.font = pygame.font.Font(None, 30)
-
-    def draw_board(self):
-        """Draws the game board and base locations."""
-        self.screen.fill(BOARD_COLOR)
+        self.board_surface = self.render_board()
+        self.panel_surface = None
+        self._panel_moves = None  # Number of moves panel_surface was rendered with
+        self._text_cache = {}  # (text, color) -> rendered surface
+        self._turn_moves = {}  # {from square: {target position: move}} of the current turn
+        self._turn_ply = None
+        self.animation = None  # (start position, end position, start ticks, move) of the pod being moved
+        self.animation_center = None
+        self.ai_thread = None
+        self.dirty = [BOARD_RECT, PANEL_RECT]  # Screen areas to redraw on the next frame
+
+    def render_board(self):
+        """Renders the board background, bases and grid once, to be blitted on every redraw."""
+        surface = pygame.Surface(BOARD_RECT.size).convert()
+        surface.fill(BOARD_COLOR)
 
         # Highlight bases
         for (row, col), base_owner in self.game.board.bases:
             base_color = PLAYER1_BASE_COLOR if base_owner == 0 else PLAYER2_BASE_COLOR
-            rect = pygame.Rect(col * CELL_SIZE, row * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-            pygame.draw.rect(self.screen, base_color, rect)
+            pygame.draw.rect(surface, base_color, cell_rect(row, col))
 
         # Draw grid
         for row in range(GRID_SIZE):
             for col in range(GRID_SIZE):
-                rect = pygame.Rect(col * CELL_SIZE, row * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-                pygame.draw.rect(self.screen, (100, 100, 100), rect, 1)
+                pygame.draw.rect(surface, (100, 100, 100), cell_rect(row, col), 1)
+        return surface
+
+    def draw_board(self):
+        """Draws the game board and base locations."""
+        self.screen.blit(self.board_surface, BOARD_RECT)
 
     def draw_pods(self):
         """Draws pods and their prongs, highlighting the selected pod."""
+        moving = self.animation[0] if self.animation else None
         for (row, col), pod in self.game.board.grid.items():
-            if pod:
+            if pod and (row, col) != moving:
                 base_color = PLAYER1_COLOR if pod["player"].index == 0 else PLAYER2_COLOR
                 color = tuple(max(0, c - 50) for c in base_color) if (row, col) == self.selected_pod else base_color
 
@@ -71,6 +101,10 @@ class OctiGameGUI:
                     for prong in pod["prongs"]:
                         self.draw_prong(row, col, prong)
 
+        if self.animation:
+            color = PLAYER1_COLOR if self.game.current_player_index == 0 else PLAYER2_COLOR
+            pygame.draw.circle(self.screen, color, self.animation_center, 20)
+
     def draw_prong(self, row, col, direction):
         """Draws a prong from the given position."""
         center_x = col * CELL_SIZE + CELL_SIZE // 2
@@ -97,9 +131,10 @@ class OctiGameGUI:
         existing_prongs = set(pod["prongs"])
         possible_positions = []
 
-        for direction, (dr, dc) in DIRECTIONS.items():
-            if direction not in existing_prongs:  # Avoid duplicate prongs
-                possible_positions.append((row + dr, col + dc))
+        for d, direction in enumerate(DIRECTION_ORDER):
+            neighbor = NEIGHBOR[row * GRID_SIZE + col][d]
+            if direction not in existing_prongs and neighbor >= 0:  # Avoid duplicate prongs
+                possible_positions.append(divmod(neighbor, GRID_SIZE))
 
         return possible_positions
 
@@ -108,135 +143,188 @@ class OctiGameGUI:
         x, y = pos
         return y // CELL_SIZE, x // CELL_SIZE
 
-    def draw_text(self, text, position, color=TEXT_COLOR):
-        """Displays text on the screen."""
-        text_surface = self.font.render(text, True, color)
-        self.screen.blit(text_surface, position)
+    def text_surface(self, text, color=TEXT_COLOR):
+        """Returns the rendered surface of a text, rendering each (text, color) only once."""
+        key = (text, color)
+        surface = self._text_cache.get(key)
+        if surface is None:
+            if len(self._text_cache) > 1024:
+                self._text_cache.clear()
+            surface = self._text_cache[key] = self.font.render(text, True, color)
+        return surface
+
+    def draw_text(self, text, position, color=TEXT_COLOR, surface=None):
+        """Displays text on the screen (or another surface)."""
+        (surface or self.screen).blit(self.text_surface(text, color), position)
+
+    def get_valid_moves(self, pod_position):
+        """Returns {target position: move} for the selected pod's steps, jumps and multi-jumps."""
+        if self._turn_ply != self.game.ply:  # Generate the turn's moves once, grouped by pod
+            self._turn_moves = {}
+            for move in self.game.get_possible_moves():
+                if move_kind(move) != PRONG:
+                    targets = self._turn_moves.setdefault(move_from(move), {})
+                    targets.setdefault(divmod(move_to(move), GRID_SIZE), move)
+            self._turn_ply = self.game.ply
+        return self._turn_moves.get(pod_position[0] * GRID_SIZE + pod_position[1], {})
 
-    def get_valid_moves(self, pod_position, allow_multi_jump=False, visited=None):
-        """Returns valid move positions, including multi-jumps."""
-        row, col = pod_position
-        valid_moves = []
-
-        if visited is None:
-            visited = set()
+    def draw_possible_moves(self, pod_position):
+        """Highlights possible move locations for the selected pod."""
+        for row, col in self.get_valid_moves(pod_position):
+            pygame.draw.rect(self.screen, (0, 255, 0), cell_rect(row, col), 5)  # Green border for valid moves
+
+    def move_pod_animated(self, move):
+        """Starts animating a move's pod to its target; update_animation plays the move once it arrives."""
+        start, end = divmod(move_from(move), GRID_SIZE), divmod(move_to(move), GRID_SIZE)
+        self.animation = (start, end, pygame.time.get_ticks(), move)
+        self.animation_center = cell_rect(*start).center
+        self.selected_pod = None
+        self.prong_options = []
+        self.invalidate(BOARD_RECT)
+
+    def update_animation(self):
+        """Advances the running animation by one frame, marking the old and new pod areas dirty."""
+        if self.animation is None:
+            return
+        start, end, started, move = self.animation
+        progress = min(1.0, (pygame.time.get_ticks() - started) / (ANIMATION_SPEED * 1000))
+        (x1, y1), (x2, y2) = cell_rect(*start).center, cell_rect(*end).center
+        center = (int(x1 + progress * (x2 - x1)), int(y1 + progress * (y2 - y1)))
+        self.invalidate(pod_rect(self.animation_center), pod_rect(center))
+        self.animation_center = center
+        if progress >= 1.0:
+            self.animation = None
+            self.play_move(move)
+
+    def play_move(self, move):
+        """Plays a move in the game and marks the board and history dirty."""
+        self.game.play_turn(move)
+        self.selected_pod = None
+        self.prong_options = []
+        self.invalidate(BOARD_RECT, PANEL_RECT)
+
+    def start_ai_turn(self, player):
+        """Starts an AI player's search on a copy of the game in a background thread."""
+        self.ai_thread = threading.Thread(target=self._search, args=(player, self.game.copy()), daemon=True)
+        self.ai_thread.start()
+
+    def _search(self, player, game):
+        move = player.choose_move(game, time_ms=self.ai_time_ms)
+        pygame.event.post(pygame.event.Event(AI_MOVE_EVENT, move=move, ply=game.ply))
+
+    def finish_ai_turn(self, event):
+        """Plays the move delivered by an AI_MOVE_EVENT, unless the game moved on since the search started."""
+        self.ai_thread = None
+        if event.ply != self.game.ply or event.move is None or self.game.winner:
+            return
+        if move_kind(event.move) == PRONG:
+            self.play_move(event.move)
+        else:
+            self.move_pod_animated(event.move)
 
-        for direction in DIRECTIONS.values():
-            dr, dc = direction
-            adjacent_pos = (row + dr, col + dc)
-            jump_pos = (row + 2 * dr, col + 2 * dc)
+    def draw_history_panel(self):
+        """Draws the move history panel on the right side of the screen."""
+        if self._panel_moves != len(self.game.moves):  # Re-render only after a move
+            self.panel_surface = pygame.Surface(PANEL_RECT.size).convert()
+            self.panel_surface.fill(HISTORY_BG_COLOR)
+
+            # Title
+            self.draw_text("Move History", (20, 10), (0, 0, 0), self.panel_surface)
+
+            # Display last 10 moves
+            recent_moves = self.game.move_log[-10:]
+            for i, move in enumerate(reversed(recent_moves)):
+                self.draw_text(move[1], (10, 40 + i * 30), surface=self.panel_surface)
+            self._panel_moves = len(self.game.moves)
+        self.screen.blit(self.panel_surface, PANEL_RECT)
+
+    def invalidate(self, *rects):
+        """Marks screen areas to be redrawn on the next frame."""
+        self.dirty.extend(rects)
+
+    def render(self):
+        """Redraws the dirty screen areas, if any, and updates only those on the display."""
+        if not self.dirty:
+            return
+        self.screen.set_clip(self.dirty[0].unionall(self.dirty[1:]))
+        self.draw_board()
+        self.draw_pods()
+        self.draw_history_panel()
 
-            # Normal move (only allowed if it's the first move)
-            if not allow_multi_jump and adjacent_pos not in self.game.board.grid:
-                valid_moves.append(adjacent_pos)
+        if self.selected_pod:
+            self.draw_possible_moves(self.selected_pod)
+            self.draw_prong_options()
 
-            # Jumping: If adjacent cell has a pod and the jump cell is empty
-            elif adjacent_pos in self.game.board.grid and jump_pos not in self.game.board.grid:
-                if jump_pos not in visited:  # Avoid infinite loops
-                    valid_moves.append(jump_pos)
-                    visited.add(jump_pos)
+        if self.game.winner:
+            self.draw_text(f"{self.game.winner} Wins!", (SCREEN_WIDTH // 3, SCREEN_HEIGHT // 2))
 
-                    # Recursively check for more jumps
-                    valid_moves.extend(self.get_valid_moves(jump_pos, allow_multi_jump=True, visited=visited))
+        self.screen.set_clip(None)
+        pygame.display.update(self.dirty)
+        self.dirty = []
 
-        return valid_moves
+    def handle_click(self, row, col):
+        """Handles a left-click of the human player to move on the board."""
+        if (row, col) in self.prong_options:
+            # Add prong as a move
+            square = self.selected_pod[0] * GRID_SIZE + self.selected_pod[1]
+            direction = NEIGHBOR[square].index(row * GRID_SIZE + col)
+            self.play_move(PRONG_MOVES[square][direction])
+            return
 
-    def draw_possible_moves(self, pod_position):
-        """Highlights possible move locations for the selected pod."""
-        valid_moves = self.get_valid_moves(pod_position)
-
-        for row, col in valid_moves:
-            rect = pygame.Rect(col * CELL_SIZE, row * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-            pygame.draw.rect(self.screen, (0, 255, 0), rect, 5)  # Green border for valid moves
-
-    def move_pod_animated(self, start, end):
-        """Animates a pod moving from `start` to `end`."""
-        x1, y1 = start[1] * CELL_SIZE + CELL_SIZE // 2, start[0] * CELL_SIZE + CELL_SIZE // 2
-        x2, y2 = end[1] * CELL_SIZE + CELL_SIZE // 2, end[0] * CELL_SIZE + CELL_SIZE // 2
-        start_time = time.time()
-
-        while time.time() - start_time < ANIMATION_SPEED:
-            progress = (time.time() - start_time) / ANIMATION_SPEED
-            x = int(x1 + progress * (x2 - x1))
-            y = int(y1 + progress * (y2 - y1))
-
-            self.draw_board()
-            self.draw_pods()
-            pygame.draw.circle(self.screen, PLAYER1_COLOR if self.game.current_player_index == 0 else PLAYER2_COLOR,
-                               (x, y), 20)
-            self.draw_history_panel()
-            pygame.display.flip()
+        if self.selected_pod:
+            old_position = self.selected_pod
+            new_position = (row, col)
 
-        self.draw_board()
-        self.draw_pods()
-        self.draw_history_panel()
-        pygame.display.flip()
+            valid_moves = self.get_valid_moves(old_position)
 
-    def draw_history_panel(self):
-        """Draws the move history panel on the right side of the screen."""
-        history_rect = pygame.Rect(GRID_SIZE * CELL_SIZE, 0, PANEL_WIDTH, SCREEN_HEIGHT)
-        pygame.draw.rect(self.screen, HISTORY_BG_COLOR, history_rect)
+            if new_position in valid_moves:
+                self.move_pod_animated(valid_moves[new_position])
 
-        # Title
-        self.draw_text("Move History", (GRID_SIZE * CELL_SIZE + 20, 10), (0, 0, 0))
+            elif new_position == old_position:
+                self.prong_options = self.get_prong_positions(new_position)
+                self.invalidate(BOARD_RECT)
 
-        # Display last 10 moves
-        recent_moves = self.game.move_log[-10:]
-        for i, move in enumerate(reversed(recent_moves)):
-            self.draw_text(move[1], (GRID_SIZE * CELL_SIZE + 10, 40 + i * 30))
+        elif (row, col) in self.game.board.grid and self.game.board.grid[(row, col)] is not None and self.game.board.grid[(row, col)]["player"].index == self.game.current_player_index:
+            self.selected_pod = (row, col)
+            self.prong_options = self.get_prong_positions((row, col))
+            self.invalidate(BOARD_RECT)
 
     def run(self):
         """Runs the main game loop."""
         running = True
         while running:
-            self.draw_board()
-            self.draw_pods()
-            self.draw_history_panel()
-
-            if self.selected_pod:
-                self.draw_possible_moves(self.selected_pod)
-                self.draw_prong_options()
+            self.update_animation()
 
-            if self.game.winner:
-                self.draw_text(f"{self.game.winner} Wins!", (SCREEN_WIDTH // 3, SCREEN_HEIGHT // 2))
-
-            pygame.display.flip()
+            player = self.game.get_current_player()
+            waiting = self.game.winner or self.animation is not None
+            if player.is_ai and not waiting and self.ai_thread is None:
+                self.start_ai_turn(player)
 
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
 
-                elif event.type == pygame.MOUSEBUTTONDOWN and not self.game.winner:
-                    row, col = self.get_cell_from_mouse(event.pos)
+                elif event.type == AI_MOVE_EVENT:
+                    self.finish_ai_turn(event)
 
-                    if event.button == 1:  # Left-click
-                        if (row, col) in self.prong_options:
-                            # Add prong as a move
-                            direction = next((d for d, (dr, dc) in DIRECTIONS.items() if (row, col) == (self.selected_pod[0] + dr, self.selected_pod[1] + dc)), None)
-                            if direction:
-                                self.game.play_turn(f"prong {str(self.selected_pod).replace(' ', '')} {direction}")
-                                self.selected_pod = None
-                                self.prong_options = []
-                                continue
+                elif event.type == pygame.VIDEOEXPOSE:
+                    self.invalidate(BOARD_RECT, PANEL_RECT)
 
-                        if self.selected_pod:
-                            old_position = self.selected_pod
-                            new_position = (row, col)
+                elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and not player.is_ai and not waiting:
+                    self.handle_click(*self.get_cell_from_mouse(event.pos))  # Left-click
 
-                            valid_moves = self.get_valid_moves(old_position, allow_multi_jump=True)
+            self.render()
+            self.clock.tick(FPS)
 
-                            if new_position in valid_moves:
-                                self.move_pod_animated(old_position, new_position)
-                                self.game.play_turn(f"move {str(old_position).replace(' ', '')} to {new_position}")
-                                self.selected_pod = None
-                                self.prong_options = []
+        pygame.quit()
+        sys.exit()
 
-                            elif new_position == old_position:
-                                self.prong_options = self.get_prong_positions(new_position)
 
-                        elif (row, col) in self.game.board.grid and self.game.board.grid[(row, col)] is not None and self.game.board.grid[(row, col)]["player"].index == self.game.current_player_index:
-                            self.selected_pod = (row, col)
-                            self.prong_options = self.get_prong_positions((row, col))
+def cell_rect(row, col):
+    """Returns the screen rectangle of a board cell."""
+    return pygame.Rect(col * CELL_SIZE, row * CELL_SIZE, CELL_SIZE, CELL_SIZE)
 
-        pygame.quit()
-        sys.exit()
+
+def pod_rect(center):
+    """Returns the screen area covered by a pod drawn at a pixel center, border included."""
+    return pygame.Rect(center[0] - 23, center[1] - 23, 46, 46)
@@ -1,16 +1,101 @@
+import copy
+
 import torch
 import torch.nn as nn
 import torch.optim as optim
 import numpy as np
 
+from encoding import FEATURE_SIZE
+from move import NUM_ACTIONS
+
+
 class OctiNet(nn.Module):
-    def __init__(self):
+    def __init__(self, input_size=FEATURE_SIZE, policy_head=False):
         super(OctiNet, self).__init__()
-        self.fc1 = nn.Linear(64, 128)  # 64 input features (board state)
+        self.input_size = input_size
+        self.fc1 = nn.Linear(input_size, 128)  # Board state features, see encoding.py
         self.fc2 = nn.Linear(128, 64)
         self.fc3 = nn.Linear(64, 1)  # Output: board evaluation score
+        # Optional move prior over move.NUM_ACTIONS (from square x kind x first-hop direction)
+        self.policy = nn.Linear(64, NUM_ACTIONS) if policy_head else None
+
+    @property
+    def has_policy(self):
+        return self.policy is not None
 
     def forward(self, x):
         x = torch.relu(self.fc1(x))
         x = torch.relu(self.fc2(x))
         return self.fc3(x)  # Single score
+
+    def forward_policy(self, x):
+        """Returns (value, policy logits) for a model built with policy_head=True."""
+        x = torch.relu(self.fc1(x))
+        x = torch.relu(self.fc2(x))
+        return self.fc3(x), self.policy(x)
+
+
+class ScriptedOctiNet:
+    """
+    Inference-only OctiNet compiled to a frozen TorchScript module (optionally with int8 weights),
+    usable wherever an OctiNet is evaluated. `source` is the eager model it was compiled from, if
+    any; its parameters stand in for the module's so evaluators notice when it gets new weights.
+    """
+
+    def __init__(self, module, input_size, has_policy, quantized=False, source=None):
+        self.module = module
+        self.input_size = input_size
+        self.has_policy = has_policy
+        self.quantized = quantized
+        self.source = source
+
+    def __call__(self, x):
+        return self.module(x)
+
+    def forward_policy(self, x):
+        return self.module.forward_policy(x)
+
+    def parameters(self):
+        return self.source.parameters() if self.source is not None else iter(())
+
+    def eval(self):
+        return self
+
+
+def compile_model(model, quantize=False):
+    """Traces and freezes an OctiNet for CPU inference, with dynamically quantized int8 Linear layers if asked."""
+    compiled = copy.deepcopy(model).eval()
+    if quantize:
+        compiled = torch.ao.quantization.quantize_dynamic(compiled, {nn.Linear}, dtype=torch.qint8)
+    example = torch.zeros(1, model.input_size)
+    methods = {"forward": example, "forward_policy": example} if model.has_policy else {"forward": example}
+    with torch.no_grad():
+        module = torch.jit.trace_module(compiled, methods)
+    module = torch.jit.freeze(module, preserved_attrs=["forward_policy"] if model.has_policy else [])
+    return ScriptedOctiNet(module, model.input_size, model.has_policy, quantize, source=model)
+
+
+def export_model(model, path, quantize=False):
+    """Saves a compiled (and optionally quantized) OctiNet that load_model reads back without the Python class."""
+    compiled = compile_model(model, quantize)
+    extra_files = {"octinet.json": f'{{"input_size": {model.input_size}, "policy_head": {int(model.has_policy)}, '
+                                   f'"quantized": {int(quantize)}}}'}
+    torch.jit.save(compiled.module, path, _extra_files=extra_files)
+    return compiled
+
+
+def load_model(path):
+    """Loads a model file: an export_model file as a ScriptedOctiNet, or a saved state dict as an OctiNet."""
+    import json
+
+    extra_files = {"octinet.json": ""}
+    try:
+        module = torch.jit.load(path, _extra_files=extra_files)
+    except RuntimeError:
+        state_dict = torch.load(path)
+        model = OctiNet(state_dict["fc1.weight"].shape[1], policy_head="policy.weight" in state_dict)
+        model.load_state_dict(state_dict)
+        model.eval()
+        return model
+    meta = json.loads(extra_files["octinet.json"])
+    return ScriptedOctiNet(module, meta["input_size"], bool(meta["policy_head"]), bool(meta["quantized"]))
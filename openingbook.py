@@ -0,0 +1,104 @@
+import os
+from array import array
+
+import numpy as np
+
+from bitboard import BitBoard
+from octigame import OctiGame
+from player import Player
+
+# One record per (position, move): Zobrist key of the position with the side to move, the packed
+# move, the number of games it was played in and the sum of their outcomes for the side that played it
+BOOK_DTYPE = np.dtype([("key", "<u8"), ("move", "<u8"), ("games", "<u4"), ("score", "<i4")])
+
+
+def build_book(games, path, max_ply=16, min_games=2):
+    """
+    Builds an opening book file from finished games, given as (moves, outcome) pairs with the
+    outcome from player 0's side (+1 win, -1 loss, 0 draw). Every move of the first `max_ply`
+    plies is counted under its position; moves played in fewer than `min_games` games are left
+    out. The records are sorted by key and saved as a .npy file, written atomically.
+    Returns the number of records.
+    """
+    keys, moves, scores = array("Q"), array("Q"), array("b")
+    for game_moves, outcome in games:
+        game = OctiGame(Player(0), Player(1), BitBoard(), observer=None)
+        for move in game_moves[:max_ply]:
+            if game.winner:
+                break
+            keys.append(game.hash)
+            moves.append(move)
+            scores.append(int(outcome) if game.current_player_index == 0 else -int(outcome))
+            game.make_move(move)
+
+    positions = np.empty(len(keys), dtype=[("key", "<u8"), ("move", "<u8")])
+    positions["key"] = np.frombuffer(keys, dtype=np.uint64) if keys else 0
+    positions["move"] = np.frombuffer(moves, dtype=np.uint64) if moves else 0
+    unique, inverse, counts = np.unique(positions, return_inverse=True, return_counts=True)
+    score_sums = np.bincount(inverse.ravel(), weights=np.frombuffer(scores, dtype=np.int8), minlength=len(unique))
+
+    kept = counts >= min_games
+    book = np.empty(int(kept.sum()), dtype=BOOK_DTYPE)
+    book["key"] = unique["key"][kept]
+    book["move"] = unique["move"][kept]
+    book["games"] = counts[kept]
+    book["score"] = score_sums[kept]
+
+    with open(path + ".tmp", "wb") as book_file:
+        np.save(book_file, book)
+    os.replace(path + ".tmp", path)
+    return len(book)
+
+
+class OpeningBook:
+    """
+    Move statistics by position, memory-mapped from a file written by build_book and looked up by
+    binary search on the sorted keys, so opening it reads nothing but the .npy header.
+    probe() answers for the first `max_ply` plies: with temperature 0 it plays the move that scored
+    the most points (wins plus half the draws), otherwise it samples moves by points^(1/temperature)
+    to vary self-play openings.
+    """
+
+    def __init__(self, path, max_ply=16, temperature=0.0, min_games=1, seed=None):
+        self.entries = np.load(path, mmap_mode="r")
+        self.keys = self.entries["key"]
+        self.max_ply = max_ply
+        self.temperature = temperature
+        self.min_games = min_games
+        self.rng = np.random.default_rng(seed)
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, key):
+        """Returns the records of a position's Zobrist key, a slice of the mapped array."""
+        key = np.uint64(key)
+        start = np.searchsorted(self.keys, key, "left")
+        stop = np.searchsorted(self.keys, key, "right")
+        return self.entries[start:stop]
+
+    def probe(self, game):
+        """Returns (move, mean score for the side to move) from the book, or None to search the position."""
+        if game.ply >= self.max_ply:
+            return None
+        records = list(self.lookup(game.hash))
+        if records:
+            legal = set(game.get_possible_moves())  # Guards against key collisions
+            records = [record for record in records
+                       if record["games"] >= self.min_games and int(record["move"]) in legal]
+        if records:
+            games = np.array([record["games"] for record in records], dtype=np.float64)
+            points = (np.array([record["score"] for record in records]) + games) / 2
+        if not records or not points.any():  # Unknown position, or every book move lost
+            self.misses += 1
+            return None
+
+        if self.temperature:
+            weights = points ** (1 / self.temperature)
+            choice = self.rng.choice(len(records), p=weights / weights.sum())
+        else:
+            choice = int(np.argmax(points))
+        self.hits += 1
+        record = records[choice]
+        return int(record["move"]), float(record["score"]) / float(record["games"])
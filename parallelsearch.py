@@ -0,0 +1,132 @@
+import torch
+import torch.multiprocessing as multiprocessing
+
+from bitboard import BitBoard
+from octigame import OctiGame
+from player import Player
+from transposition import TranspositionTable
+
+_worker = {}  # The searcher of a pool process, built once by _init_worker
+
+
+def game_position(game):
+    """Returns a picklable copy of a game's position: squares, side to move, ply and move limit."""
+    board = game.board
+    squares = tuple((board.owner(square), board.prong_mask(square)) for square in range(64))
+    return squares, game.current_player_index, game.ply, game.max_moves
+
+
+def restore_game(position):
+    """Rebuilds a headless OctiGame on a BitBoard from a game_position copy."""
+    squares, player, ply, max_moves = position
+    game = OctiGame(Player(0), Player(1), BitBoard(), max_moves=max_moves, observer=None)
+    for square, (owner, prongs) in enumerate(squares):
+        game.board.set_square(square, owner, prongs)
+    game.current_player_index = player
+    game.ply = ply
+    return game
+
+
+def _init_worker(player_factory, tt_name, tt_bytes, stop_event):
+    """Pool initializer: builds this process's searcher, attached to the shared transposition table if any."""
+    torch.set_num_threads(1)  # One core per searcher
+    player = player_factory()
+    player.stop_event = stop_event
+    if tt_name is not None:
+        player.tt = TranspositionTable.attach_shared(tt_name, tt_bytes)
+    _worker["player"] = player
+    _worker["depth"] = getattr(player, "depth", None)
+
+
+def _search_task(position, root_moves, time_ms, max_nodes, depth_offset, generation):
+    """Searches a position in a pool process and returns (move, score for the side to move, nodes)."""
+    player = _worker["player"]
+    if _worker["depth"] is not None:
+        player.depth = _worker["depth"] + depth_offset
+    if generation is not None:
+        player.tt.generation = (generation - 1) & 0xFFFF  # choose_move's new_search brings it to the main search's
+    move = player.choose_move(restore_game(position), time_ms, max_nodes, root_moves)
+    return move, player.last_score, player.nodes
+
+
+class ParallelSearch(Player):
+    """
+    Searches every move with several processes, wrapping any tree-search player built by
+    `player_factory` (a picklable callable such as functools.partial(OctiAIPlayer, "AI", model)).
+    mode="root" splits the root moves between the workers and plays the best-scoring result.
+    mode="smp" (Lazy SMP, alpha-beta players only) has every worker search the whole position
+    through one transposition table in shared memory, with every other helper a ply deeper,
+    and plays the move found by the searcher in this process.
+    """
+
+    def __init__(self, player_factory, num_workers=4, mode="root", tt_bytes=64 * 1024 * 1024):
+        if mode not in ("root", "smp"):
+            raise ValueError(f"Unknown parallel search mode: {mode}")
+        self.player = player_factory()
+        super().__init__(self.player.index, is_ai=True, name=self.player.name)
+        self.mode = mode
+        self.num_workers = num_workers
+        self.nodes = 0
+        self.last_score = 0.0
+        self.tt = None
+        tt_name = None
+        if mode == "smp":
+            if not hasattr(self.player, "tt"):
+                raise ValueError("Lazy SMP needs a player with a transposition table")
+            self.tt = TranspositionTable.create_shared(tt_bytes)
+            self.player.tt = self.tt
+            tt_name = self.tt.shared_memory.name
+
+        self.stop_event = multiprocessing.Event()
+        helpers = num_workers - 1 if mode == "smp" else num_workers
+        self.pool = None
+        if helpers:
+            self.pool = multiprocessing.Pool(helpers, _init_worker,
+                                             (player_factory, tt_name, tt_bytes, self.stop_event))
+
+    def choose_move(self, game, time_ms=None, max_nodes=None):
+        """Searches the current position with every worker and returns the chosen move."""
+        if self.mode == "root":
+            return self._split_root(game, time_ms, max_nodes)
+        return self._lazy_smp(game, time_ms, max_nodes)
+
+    def _split_root(self, game, time_ms, max_nodes):
+        moves = game.get_possible_moves()
+        if len(moves) <= 1:
+            return moves[0] if moves else None
+        subsets = [moves[i::self.num_workers] for i in range(min(self.num_workers, len(moves)))]
+        budget = max_nodes // len(subsets) if max_nodes is not None else None
+        position = game_position(game)
+        results = self.pool.starmap(_search_task, [(position, subset, time_ms, budget, 0, None) for subset in subsets],
+                                    chunksize=1)
+        self.nodes = sum(nodes for _, _, nodes in results)
+        move, self.last_score, _ = max(results, key=lambda result: result[1])
+        return move
+
+    def _lazy_smp(self, game, time_ms, max_nodes):
+        self.stop_event.clear()
+        pending = None
+        if self.pool is not None:
+            generation = (self.tt.generation + 1) & 0xFFFF
+            position = game_position(game)
+            tasks = [(position, None, time_ms, max_nodes, helper % 2, generation)
+                     for helper in range(1, self.num_workers)]
+            pending = self.pool.starmap_async(_search_task, tasks, chunksize=1)
+        try:
+            move = self.player.choose_move(game, time_ms, max_nodes)
+        finally:
+            self.stop_event.set()  # Helpers still searching return their last completed iteration
+            helper_results = pending.get() if pending is not None else []
+        self.nodes = self.player.nodes + sum(nodes for _, _, nodes in helper_results)
+        self.last_score = self.player.last_score
+        return move
+
+    def close(self):
+        """Stops the worker processes and frees the shared transposition table."""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        if self.tt is not None:
+            self.tt.close(unlink=True)
+            self.tt = None
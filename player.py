@@ -1,7 +1,10 @@
 class Player:
-    def __init__(self, index: int, is_ai: bool = False):
+    def __init__(self, index: int, is_ai: bool = False, name: str = None):
         self.index = index
         self.is_ai = is_ai
+        if name is None:
+            name = f"Player {index + 1}" if index is not None else "Player"
+        self.name = name
 
     def __repr__(self):
         return f"Player({self.index}, AI={self.is_ai})"
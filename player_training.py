@@ -1,63 +1,224 @@
-import multiprocessing
-import torch
+import queue
+import time
 
-from octigame import OctiGame
-from octinet import OctiNet
+import numpy as np
+import torch
+import torch.multiprocessing as multiprocessing
+
+from checkpoint import CheckpointManager
+from evalcache import CachedEvaluator
+from evaluator import ModelEvaluator
+from gamerecord import GameRecordWriter
+from inference import InferenceServer
+from octinet import OctiNet, compile_model
+from openingbook import OpeningBook
 from playerai import OctiAIPlayer
-from rltrainer import RLTrainer
-
-
-def self_play_worker(worker_id, rounds, model_path, return_dict):
-    """Worker function for running self-play games in parallel."""
+from replaybuffer import ReplayBuffer
+from rltrainer import ArrayDataset, RLTrainer, play_self_play_game
+from tablebase import Tablebase
+
+
+def self_play_worker(worker_id, shared_model, weights_version, generation, weights_lock, result_queue, stop_event,
+                     depth=3, games_per_chunk=8, inference_client=None, compiled=None, book_path=None,
+                     tablebase_path=None, random_plies=4, seed=None):
+    """
+    Long-lived self-play process. Plays games with a local copy of the learner's published weights,
+    refreshing it in place whenever `weights_version` changes, or through `inference_client` when the
+    pool runs an inference server, and streams finished games back in chunks of (states, outcomes)
+    arrays, with the GameRecord, weights version and checkpoint generation of every game, together with
+    its throughput. compiled="script" or "quantized" evaluates with a TorchScript (or int8 quantized)
+    compilation of the local model, redone after every refresh. With book_path, both players open from
+    that opening book, sampling its moves (temperature 1) to vary the games.
+    With tablebase_path, the search scores solved positions exactly and games end once one is reached.
+    Without a book, games open with `random_plies` random moves, drawn from a generator seeded with
+    (seed, worker_id), so that workers do not all play the same game.
+    """
+    torch.set_num_threads(1)  # One core per worker
+    local_version = local_generation = -1
+    if inference_client is None:
+        model = OctiNet(shared_model.input_size, policy_head=shared_model.has_policy)
+        model.eval()
+        model_evaluator = ModelEvaluator(model)
+    else:
+        model = None  # The server holds the only copy
+        model_evaluator = inference_client
+
+    # Shared by both players and across games
+    evaluator = CachedEvaluator(model_evaluator)
+    book = OpeningBook(book_path, temperature=1.0) if book_path else None
+    tablebase = Tablebase(tablebase_path) if tablebase_path else None
+    rng = np.random.default_rng(None if seed is None else (seed, worker_id))
+    random_plies = 0 if book else random_plies
+    players = [OctiAIPlayer("AI1", model, depth=depth, evaluator=evaluator, book=book, tablebase=tablebase),
+               OctiAIPlayer("AI2", model, depth=depth, evaluator=evaluator, book=book, tablebase=tablebase)]
+
+    games = samples = 0
+    started = time.perf_counter()
+    chunk_states, chunk_outcomes, chunk_records, chunk_versions, chunk_generations = [], [], [], [], []
+
+    while not stop_event.is_set():
+        if inference_client is None and weights_version.value != local_version:
+            with weights_lock:
+                model.load_state_dict(shared_model.state_dict())  # In place; also invalidates the cache
+                local_version = weights_version.value
+                local_generation = generation.value
+            if compiled:
+                model_evaluator.model = compile_model(model, quantize=compiled == "quantized")
+        elif inference_client is not None:
+            # A game spanning a hot-swap keeps the generation it started with
+            local_version, local_generation = inference_client.served_weights()
+
+        states, outcome, record = play_self_play_game(players, tablebase=tablebase, random_plies=random_plies,
+                                                    rng=rng)
+        chunk_states.append(states)
+        chunk_outcomes.append(np.full(len(states), outcome, dtype=np.float32))
+        chunk_records.append(record)
+        chunk_versions.append(local_version)
+        chunk_generations.append(local_generation)
+        games += 1
+        samples += len(states)
+
+        if len(chunk_states) == games_per_chunk:
+            elapsed = time.perf_counter() - started
+            result_queue.put({
+                "worker_id": worker_id,
+                "states": np.concatenate(chunk_states),
+                "outcomes": np.concatenate(chunk_outcomes),
+                "game_lengths": [len(states) for states in chunk_states],
+                "weights_versions": chunk_versions,
+                "generations": chunk_generations,
+                "records": chunk_records,
+                "games": len(chunk_states),
+                "games_per_sec": games / elapsed,
+                "samples_per_sec": samples / elapsed,
+            })
+            chunk_states, chunk_outcomes, chunk_records, chunk_versions, chunk_generations = [], [], [], [], []
+
+
+class SelfPlayPool:
+    """
+    Persistent pool of self-play processes fed with weight updates and streaming finished games.
+    With use_inference_server, workers hold no model and send positions to one InferenceServer instead;
+    otherwise compiled="script" or "quantized" has them evaluate with a compiled copy of their model.
+    Each worker opens its games with `random_plies` random moves from its own seeded generator.
+    """
+
+    def __init__(self, model, num_workers=4, depth=3, games_per_chunk=8, use_inference_server=False,
+                 max_batch=1024, max_latency_ms=2.0, compiled=None, generation=None, book_path=None,
+                 tablebase_path=None, random_plies=4, seed=None):
+        self.num_workers = num_workers
+        self.server = InferenceServer(model, num_workers, max_batch, max_latency_ms) if use_inference_server else None
+        self.shared_model = OctiNet(model.input_size, policy_head=model.has_policy)
+        self.shared_model.share_memory()
+        self.weights_version = multiprocessing.Value("l", 0)  # Bumped on every publish; workers reload on change
+        self.generation = multiprocessing.Value("l", -1)  # Checkpoint generation of the local-model workers' weights
+        self.weights_lock = multiprocessing.Lock()
+        self.result_queue = multiprocessing.Queue()
+        self.stop_event = multiprocessing.Event()
+        self.worker_stats = {}
+        self.publish(model, generation)
+
+        self.processes = [
+            multiprocessing.Process(
+                target=self_play_worker,
+                args=(i, self.shared_model, self.weights_version, self.generation, self.weights_lock,
+                      self.result_queue, self.stop_event, depth, games_per_chunk,
+                      self.server.client(i) if self.server else None, compiled, book_path, tablebase_path,
+                      random_plies, seed),
+                daemon=True,
+            )
+            for i in range(num_workers)
+        ]
+        for process in self.processes:
+            process.start()
+
+    def publish(self, model, generation=None):
+        """
+        Sends the learner's weights to the workers (or the inference server), taking effect before their
+        next game. Chunks report the checkpoint generation each of their games was played with (-1 when
+        none is given); workers notice new weights by the weights version, which every publish bumps.
+        """
+        if self.server:
+            self.server.publish(model, generation if generation is not None else -1)
+            return
+        with self.weights_lock:
+            self.shared_model.load_state_dict(model.state_dict())
+            self.weights_version.value += 1
+            self.generation.value = generation if generation is not None else -1
+
+    def results(self, timeout=None):
+        """Yields chunks of finished games as workers send them, until `timeout` seconds pass without one."""
+        while True:
+            try:
+                chunk = self.result_queue.get(timeout=timeout)
+            except queue.Empty:
+                return
+            self.worker_stats[chunk["worker_id"]] = (chunk["games_per_sec"], chunk["samples_per_sec"])
+            yield chunk
+
+    def report(self):
+        """Prints the latest games/sec and samples/sec of every worker."""
+        for worker_id, (games_per_sec, samples_per_sec) in sorted(self.worker_stats.items()):
+            print(f"worker {worker_id}: {games_per_sec:.2f} games/s, {samples_per_sec:.1f} samples/s")
+        if self.server:
+            self.server.report()
+
+    def close(self):
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        if self.server:
+            self.server.close()
+
+
+def run_parallel_training(num_workers=4, rounds_per_worker=500, publish_every=4, use_inference_server=False,
+                          buffer_path="replay_buffer", samples_per_chunk=256, compiled=None,
+                          checkpoint_dir="checkpoints", keep_checkpoints=20, book_path=None,
+                          tablebase_path=None, record_path=None):
+    """
+    Runs self-play in a persistent worker pool, appends the games to an on-disk replay buffer
+    as they stream in and trains on samples drawn from it. Starts from the latest checkpoint
+    generation and saves a new generation each time it publishes weights to the workers.
+    With record_path, every game is also appended to that game-record file.
+    """
     model = OctiNet()
-    model.load_state_dict(torch.load(model_path))  # Load shared model
-    model.eval()
-
     trainer = RLTrainer(model)
-    game_history = []
-
-    for _ in range(rounds):
-        game = OctiGame(OctiAIPlayer("AI1", model), OctiAIPlayer("AI2", model))
-
-        while not game.winner:
-            board_state = game.board.to_vector()
-            move = game.players[game.current_player].choose_move(game)
-            game.make_move(move)
-            game_history.append((board_state, None))  # Store moves
-
-        outcome = 1 if game.winner == "AI1" else -1
-        for i in range(len(game_history)):
-            game_history[i] = (game_history[i][0], outcome)
-
-        return_dict[worker_id] = game_history  # Store training data
-
-
-def run_parallel_training(num_workers=4, rounds_per_worker=500):
-    """Runs self-play training in parallel using multiprocessing."""
-    model = OctiNet()
-    torch.save(model.state_dict(), "octi_ai.pth")  # Save initial model
-
-    manager = multiprocessing.Manager()
-    return_dict = manager.dict()
-    processes = []
-
-    for i in range(num_workers):
-        p = multiprocessing.Process(
-            target=self_play_worker, args=(i, rounds_per_worker, "octi_ai.pth", return_dict)
-        )
-        processes.append(p)
-        p.start()
-
-    for p in processes:
-        p.join()  # Wait for all processes to finish
-
-    # Combine results and train on collected data
-    trainer = RLTrainer(model)
-    all_game_data = sum(return_dict.values(), [])
-
-    for board_state, outcome in all_game_data:
-        trainer.train_step(board_state, outcome)
-
-    torch.save(model.state_dict(), "octi_ai_trained.pth")  # Save trained model
-
-
+    checkpoints = CheckpointManager(checkpoint_dir, keep=keep_checkpoints)
+    generation = trainer.resume(checkpoints)
+    buffer = ReplayBuffer(buffer_path)
+    records = GameRecordWriter(record_path) if record_path else None
+    pool = SelfPlayPool(model, num_workers, use_inference_server=use_inference_server, compiled=compiled,
+                        generation=generation, book_path=book_path, tablebase_path=tablebase_path)
+
+    games_needed = num_workers * rounds_per_worker
+    games_seen = chunks = 0
+    try:
+        for chunk in pool.results():
+            offset = 0
+            for length in chunk["game_lengths"]:
+                buffer.append_game(chunk["states"][offset:offset + length], chunk["outcomes"][offset:offset + length])
+                offset += length
+            if records:
+                for record in chunk["records"]:
+                    records.append(record)
+
+            states, values, policies, _, _ = buffer.sample(samples_per_chunk)
+            trainer.train_epoch(ArrayDataset(states, values, policies), verbose=False)
+
+            games_seen += chunk["games"]
+            chunks += 1
+            if chunks % publish_every == 0:
+                generation = checkpoints.save(model, trainer.steps, trainer.samples_seen, optimizer=trainer.optimizer)
+                pool.publish(model, generation)
+                pool.report()
+            if games_seen >= games_needed:
+                break
+    finally:
+        pool.close()
+        buffer.flush()
+        if records:
+            records.close()
+
+    checkpoints.save(model, trainer.steps, trainer.samples_seen, optimizer=trainer.optimizer)
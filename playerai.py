@@ -1,58 +1,219 @@
-import torch
+import time
 
+from evaluator import ModelEvaluator, terminal_value
+from move import HOPS_SHIFT
+from player import Player
+from transposition import EXACT, LOWER, UPPER, TranspositionTable
 
-class OctiAIPlayer:
-    def __init__(self, name, model, depth=3):
-        self.name = name
+MAX_SEARCH_DEPTH = 64
+_FIRST_HOP_MASK = (1 << HOPS_SHIFT) - 1  # History index: the from/to/kind/direction bits of a move
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search once the time or node budget of choose_move is spent."""
+
+
+class OctiAIPlayer(Player):
+    def __init__(self, name, model, depth=3, tt_bytes=16 * 1024 * 1024, batch_leaves=False, evaluator=None,
+                 index=None, book=None, tablebase=None):
+        super().__init__(index, is_ai=True, name=name)
         self.model = model
         self.depth = depth
+        self.batch_leaves = batch_leaves  # Evaluate the last ply's children in one batched forward pass
+        self.evaluator = evaluator if evaluator else ModelEvaluator(model)
+        self.tt = TranspositionTable(tt_bytes)
+        self.killers = [[None, None] for _ in range(MAX_SEARCH_DEPTH)]
+        self.history = [0] * (1 << HOPS_SHIFT)  # Indexed by the from/to/kind/direction bits of a move
+        self.nodes = 0
+        self.completed_depth = 0
+        self.last_score = 0.0  # Value of the chosen move for the side to move, from the last search
+        self.stop_event = None  # Optional Event that ends a search early, e.g. a parallel search's helpers
+        self.book = book  # Optional OpeningBook played from before searching
+        self.tablebase = tablebase  # Optional Tablebase giving exact values below the root
+        self._deadline = None
+        self._node_limit = None
+        self._next_check = 256  # Node count at which minimax next checks the budget
+        self._root_moves = None
+
+    def choose_move(self, game, time_ms=None, max_nodes=None, root_moves=None):
+        """
+        Chooses the best move using iterative-deepening Minimax + Alpha-Beta + RL evaluation.
+        Without a budget it searches to self.depth; with time_ms and/or max_nodes it deepens
+        until the budget runs out and returns the best move of the last completed iteration.
+        root_moves restricts (and orders) the moves searched at the root. A position found in the
+        opening book is answered from it without a search.
+        """
+        if self.book is not None and root_moves is None:
+            entry = self.book.probe(game)
+            if entry is not None:
+                self.nodes = self.completed_depth = 0
+                move, self.last_score = entry
+                return move
 
-    def choose_move(self, game):
-        """Chooses the best move using Minimax + Alpha-Beta + RL evaluation."""
-        _, best_move = self.minimax(game, self.depth, float("-inf"), float("inf"), True)
+        self.tt.new_search()
+        self.killers = [[None, None] for _ in range(MAX_SEARCH_DEPTH)]
+        self.history = [value >> 1 for value in self.history]  # Age the history scores of the last move
+        self.nodes = 0
+        self._next_check = 256
+        self.completed_depth = 0
+        budgeted = time_ms is not None or max_nodes is not None
+        self._deadline = time.perf_counter() + time_ms / 1000 if time_ms is not None else None
+        self._node_limit = max_nodes
+
+        maximizing = game.current_player_index == 0
+        self._root_moves = list(root_moves) if root_moves is not None else None
+        moves = self._root_moves or game.get_possible_moves()
+        best_move = moves[0] if moves else None
+        self.last_score = 0.0
+        max_depth = MAX_SEARCH_DEPTH if budgeted else self.depth
+
+        for depth in range(1, max_depth + 1):
+            try:
+                score, move = self.minimax(game, depth, float("-inf"), float("inf"), maximizing)
+            except SearchTimeout:
+                break
+            if move is not None:
+                best_move = move
+                self.last_score = score if maximizing else -score
+            self.completed_depth = depth
+        self._deadline = self._node_limit = self._root_moves = None
         return best_move
 
-    def minimax(self, game, depth, alpha, beta, maximizing_player):
+    def minimax(self, game, depth, alpha, beta, maximizing_player, ply=0):
+        self.nodes += 1
+        if self.nodes >= self._next_check or self._node_limit is not None:
+            self._next_check = self.nodes + 256  # Not a modulo test: batched expansions add many nodes at once
+            self._check_budget()
+
+        if self.tablebase is not None and ply > 0 and not game.winner:
+            score = self.tablebase.score(game)
+            if score is not None:
+                return score, None
+
         if depth == 0 or game.winner:
             return self.evaluate_board(game), None
 
-        possible_moves = game.get_possible_moves()
+        key = game.hash
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry:
+            entry_depth, bound, score, tt_move = entry
+            if ply > 0 and entry_depth >= depth and (bound == EXACT or (bound == LOWER and score >= beta)
+                                                     or (bound == UPPER and score <= alpha)):
+                return score, tt_move
+
+        restricted = ply == 0 and self._root_moves is not None
+        possible_moves = list(self._root_moves) if restricted else game.get_possible_moves()
         if not possible_moves:
             return self.evaluate_board(game), None
+        self.order_moves(possible_moves, tt_move, ply)
 
+        if depth == 1 and self.batch_leaves:
+            best_eval, best_move = self._evaluate_last_ply(game, possible_moves, maximizing_player)
+            if not restricted:
+                self.tt.store(key, depth, EXACT, best_eval, best_move)
+            return best_eval, best_move
+
+        alpha_orig, beta_orig = alpha, beta
         best_move = None
         if maximizing_player:
             max_eval = float("-inf")
             for move in possible_moves:
-                game.make_temporary_move(move)
-                eval_score, _ = self.minimax(game, depth - 1, alpha, beta, False)
-                game.undo_temporary_move(move)
+                undo = game.make_move(move)
+                try:
+                    eval_score, _ = self.minimax(game, depth - 1, alpha, beta, False, ply + 1)
+                finally:
+                    game.unmake_move(undo)
 
                 if eval_score > max_eval:
                     max_eval = eval_score
                     best_move = move
                 alpha = max(alpha, eval_score)
                 if beta <= alpha:
+                    self._record_cutoff(move, depth, ply)
                     break  # Beta cutoff
-            return max_eval, best_move
+            best_eval = max_eval
         else:
             min_eval = float("inf")
             for move in possible_moves:
-                game.make_temporary_move(move)
-                eval_score, _ = self.minimax(game, depth - 1, alpha, beta, True)
-                game.undo_temporary_move(move)
+                undo = game.make_move(move)
+                try:
+                    eval_score, _ = self.minimax(game, depth - 1, alpha, beta, True, ply + 1)
+                finally:
+                    game.unmake_move(undo)
 
                 if eval_score < min_eval:
                     min_eval = eval_score
                     best_move = move
                 beta = min(beta, eval_score)
                 if beta <= alpha:
+                    self._record_cutoff(move, depth, ply)
                     break
-            return min_eval, best_move
+            best_eval = min_eval
+
+        if not restricted:  # A value over some of the root moves is not the position's value
+            bound = UPPER if best_eval <= alpha_orig else LOWER if best_eval >= beta_orig else EXACT
+            self.tt.store(key, depth, bound, best_eval, best_move)
+        return best_eval, best_move
+
+    def _evaluate_last_ply(self, game, moves, maximizing_player):
+        """Scores every child of a depth-1 node with a single batched forward pass, trading last-ply cutoffs for batching."""
+        evaluator = self.evaluator
+        values = [0.0] * len(moves)
+        pending = []
+        for i, move in enumerate(moves):
+            undo = game.make_move(move)
+            exact = self.tablebase.score(game) if self.tablebase is not None and not game.winner else None
+            if game.winner:
+                values[i] = terminal_value(game)
+            elif exact is not None:
+                values[i] = exact
+            else:
+                evaluator.encode(game, len(pending))
+                pending.append(i)
+            game.unmake_move(undo)
+        self.nodes += len(moves)
+
+        for i, score in zip(pending, evaluator.evaluate_buffer(len(pending))):
+            values[i] = score
+
+        pick = max if maximizing_player else min
+        best = pick(range(len(moves)), key=values.__getitem__)
+        return values[best], moves[best]
+
+    def order_moves(self, moves, pv_move, ply):
+        """Orders moves in place: principal-variation move, then killer moves, then by history score."""
+        killers = self.killers[ply] if ply < MAX_SEARCH_DEPTH else (None, None)
+        history = self.history
+
+        def priority(move):
+            if move == pv_move:
+                return 1 << 62
+            if move == killers[0]:
+                return 1 << 61
+            if move == killers[1]:
+                return 1 << 60
+            return history[move & _FIRST_HOP_MASK]
+
+        moves.sort(key=priority, reverse=True)
+
+    def _record_cutoff(self, move, depth, ply):
+        """Remembers a move that caused a cutoff as a killer for its ply and in the history table."""
+        if ply < MAX_SEARCH_DEPTH:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        self.history[move & _FIRST_HOP_MASK] += depth * depth
+
+    def _check_budget(self):
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchTimeout()
+        if self._node_limit is not None and self.nodes > self._node_limit:
+            raise SearchTimeout()
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise SearchTimeout()
 
     def evaluate_board(self, game):
         """Uses RL model to evaluate board state."""
-        board_state = game.board.to_vector()  # Convert board to numeric format
-        with torch.no_grad():
-            score = self.model(torch.tensor(board_state, dtype=torch.float32))
-        return score.item()
+        return self.evaluator.evaluate(game)
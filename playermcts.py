@@ -0,0 +1,327 @@
+import math
+import time
+from array import array
+from collections import deque
+from itertools import repeat
+
+import numpy as np
+
+from evaluator import ModelEvaluator, terminal_value
+from move import NUM_ACTIONS, move_action
+from player import Player
+
+
+class NodePool:
+    """
+    Struct-of-arrays storage for search nodes. A node is an index into the arrays and the
+    children of an expanded node occupy a contiguous index range. value_sum is kept from the
+    side of the player who made the node's move.
+    """
+
+    def __init__(self):
+        self.move = array("q")
+        self.prior = array("f")
+        self.visits = array("i")
+        self.value_sum = array("d")
+        self.first_child = array("i")  # -1 until the node is expanded
+        self.num_children = array("i")
+
+    def __len__(self):
+        return len(self.move)
+
+    def allocate(self, moves, priors):
+        """Appends unexpanded nodes for a list of moves and returns the index of the first one."""
+        first = len(self.move)
+        count = len(moves)
+        self.move.extend(moves)
+        self.prior.extend(priors)
+        self.visits.frombytes(bytes(4 * count))
+        self.value_sum.frombytes(bytes(8 * count))
+        self.first_child.extend(repeat(-1, count))
+        self.num_children.frombytes(bytes(4 * count))
+        return first
+
+    def copy_node(self, other, node):
+        """Appends an unexpanded copy of another pool's node, statistics included, and returns its index."""
+        index = self.allocate((other.move[node],), (other.prior[node],))
+        self.visits[index] = other.visits[node]
+        self.value_sum[index] = other.value_sum[node]
+        return index
+
+    def copy_range(self, other, first, count):
+        """Appends unexpanded copies of `count` consecutive nodes of another pool and returns the first index."""
+        start = len(self.move)
+        self.move.extend(other.move[first:first + count])
+        self.prior.extend(other.prior[first:first + count])
+        self.visits.extend(other.visits[first:first + count])
+        self.value_sum.extend(other.value_sum[first:first + count])
+        self.first_child.extend(repeat(-1, count))
+        self.num_children.frombytes(bytes(4 * count))
+        return start
+
+
+class OctiMCTSPlayer(Player):
+    """
+    Monte Carlo Tree Search player with PUCT selection. Leaves are evaluated in batches of
+    `leaf_batch` with a virtual loss spreading each batch over different lines; move priors come
+    from the model's policy head when it has one, otherwise they are uniform. The subtree of the
+    position reached after both sides' moves is kept for the next search.
+    """
+
+    def __init__(self, name, model, simulations=200, c_puct=1.5, leaf_batch=8, evaluator=None, temperature=0.0,
+                 temperature_moves=0, root_noise=0.0, dirichlet_alpha=0.3, max_tree_nodes=2_000_000, index=None,
+                 book=None, tablebase=None):
+        super().__init__(index, is_ai=True, name=name)
+        self.model = model
+        self.simulations = simulations
+        self.c_puct = c_puct
+        self.leaf_batch = leaf_batch
+        self.evaluator = evaluator if evaluator is not None else ModelEvaluator(model)
+        self.use_policy = getattr(self.evaluator, "has_policy", False)  # Priors from the policy logits
+        self.temperature = temperature  # Sample moves by visit count^(1/T) for the first temperature_moves plies
+        self.temperature_moves = temperature_moves
+        self.root_noise = root_noise  # Fraction of Dirichlet noise mixed into the root priors
+        self.dirichlet_alpha = dirichlet_alpha
+        self.max_tree_nodes = max_tree_nodes
+        self.book = book  # Optional OpeningBook played from before searching
+        self.tablebase = tablebase  # Optional Tablebase; positions it solves are leaves with exact values
+        self.rng = np.random.default_rng()
+        self.pool = None
+        self.root = 0
+        self.nodes = 0
+        self.last_score = 0.0  # Mean value of the chosen move for the side to move, from the last search
+        self.searched = False  # Whether the last choose_move searched (not the book, tablebase or a forced move)
+        self._tree_game = None
+        self._tree_ply = 0
+        self._root_moves = None
+
+    def choose_move(self, game, time_ms=None, max_nodes=None, root_moves=None):
+        """
+        Runs `self.simulations` simulations from the current position and returns the most visited
+        root move. With time_ms and/or max_nodes it instead simulates until that budget runs out.
+        root_moves restricts the root's children (the tree is then not kept for the next move).
+        A position found in the opening book or solved by the tablebase is answered from it without a search.
+        """
+        self.searched = False
+        entry = None
+        if self.tablebase is not None and root_moves is None:
+            entry = self.tablebase.best_move(game)
+        if self.book is not None and root_moves is None and entry is None:
+            entry = self.book.probe(game)
+        if entry is not None:
+            self._tree_game = None
+            self.nodes = 0
+            move, self.last_score = entry
+            return move
+
+        moves = list(root_moves) if root_moves is not None else game.get_possible_moves()
+        self.last_score = 0.0
+        if len(moves) <= 1:
+            self._tree_game = None
+            return moves[0] if moves else None
+
+        if root_moves is not None:
+            self._tree_game = None
+        self._root_moves = moves if root_moves is not None else None
+        self._reuse_tree(game)
+        if max_nodes is not None:
+            simulations = max_nodes
+        else:
+            simulations = math.inf if time_ms is not None else self.simulations
+        deadline = time.perf_counter() + time_ms / 1000 if time_ms is not None else None
+        self.nodes = 0
+
+        if self.pool.first_child[self.root] < 0:
+            self._run_batch(game, 1)
+        if self.root_noise:
+            self._add_root_noise()
+        done = 0
+        while done < simulations and len(self.pool) < self.max_tree_nodes:
+            done += self._run_batch(game, min(self.leaf_batch, simulations - done))
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+
+        self._tree_game = game if root_moves is None else None
+        self._tree_ply = len(game.moves)
+        self._root_moves = None
+        self.searched = True
+        return self._pick_move(game)
+
+    def root_policy(self):
+        """Returns the root's visit distribution over move.NUM_ACTIONS, a policy target for training."""
+        pool = self.pool
+        policy = np.zeros(NUM_ACTIONS, dtype=np.float32)
+        first = pool.first_child[self.root]
+        for child in range(first, first + pool.num_children[self.root]):
+            policy[move_action(pool.move[child])] += pool.visits[child]
+        total = policy.sum()
+        return policy / total if total else policy
+
+    def root_visits(self):
+        """Returns {action: visit count} of the root's children after a search, or None without one."""
+        if not self.searched:
+            return None
+        pool = self.pool
+        visits = {}
+        first = pool.first_child[self.root]
+        for child in range(first, first + pool.num_children[self.root]):
+            action = move_action(pool.move[child])
+            visits[action] = visits.get(action, 0) + int(pool.visits[child])
+        return visits
+
+    def _reuse_tree(self, game):
+        """Re-roots the tree at the current position when it is a continuation of the last search, else starts afresh."""
+        pool = self.pool
+        node = self.root
+        if self._tree_game is game and len(game.moves) >= self._tree_ply:
+            for move in game.moves[self._tree_ply:]:
+                first = pool.first_child[node]
+                if first < 0:
+                    node = -1
+                    break
+                children = pool.move[first:first + pool.num_children[node]]
+                if move not in children:
+                    node = -1
+                    break
+                node = first + children.index(move)
+        else:
+            node = -1
+
+        if node < 0 or pool.first_child[node] < 0:
+            self.pool = NodePool()
+            self.root = self.pool.allocate((-1,), (1.0,))
+            return
+
+        # Copy the reused subtree into a fresh pool so the discarded part of the tree is freed
+        fresh = NodePool()
+        self.root = fresh.copy_node(pool, node)
+        queue = deque(((node, self.root),))
+        while queue:
+            old, new = queue.popleft()
+            first = pool.first_child[old]
+            if first < 0:
+                continue
+            count = pool.num_children[old]
+            new_first = fresh.copy_range(pool, first, count)
+            fresh.first_child[new] = new_first
+            fresh.num_children[new] = count
+            queue.extend(zip(range(first, first + count), range(new_first, new_first + count)))
+        self.pool = fresh
+
+    def _add_root_noise(self):
+        """Mixes Dirichlet noise into the root priors for self-play exploration."""
+        pool = self.pool
+        first, count = pool.first_child[self.root], pool.num_children[self.root]
+        noise = self.rng.dirichlet([self.dirichlet_alpha] * count)
+        for child, eta in zip(range(first, first + count), noise):
+            pool.prior[child] = (1 - self.root_noise) * pool.prior[child] + self.root_noise * eta
+
+    def _pick_move(self, game):
+        """Returns the most visited root move, or samples by visit count early in the game when a temperature is set."""
+        pool = self.pool
+        first = pool.first_child[self.root]
+        visits = pool.visits[first:first + pool.num_children[self.root]]
+        if self.temperature and game.ply < self.temperature_moves:
+            weights = np.asarray(visits, dtype=np.float64) ** (1.0 / self.temperature)
+            choice = int(self.rng.choice(len(visits), p=weights / weights.sum()))
+        else:
+            choice = max(range(len(visits)), key=visits.__getitem__)
+        if visits[choice]:
+            self.last_score = pool.value_sum[first + choice] / visits[choice]
+        return pool.move[first + choice]
+
+    def _select_child(self, node):
+        """Returns the child maximizing Q + c_puct * P * sqrt(N) / (1 + n)."""
+        pool = self.pool
+        visits, value_sum, prior = pool.visits, pool.value_sum, pool.prior
+        first = pool.first_child[node]
+        scale = self.c_puct * math.sqrt(visits[node] or 1)
+        best_score = -math.inf
+        best_child = first
+        for child in range(first, first + pool.num_children[node]):
+            n = visits[child]
+            score = (value_sum[child] / n if n else 0.0) + scale * prior[child] / (1 + n)
+            if score > best_score:
+                best_score = score
+                best_child = child
+        return best_child
+
+    def _run_batch(self, game, size):
+        """Runs up to `size` simulations, evaluating their leaves in one forward pass; returns how many ran."""
+        pool = self.pool
+        evaluator = self.evaluator
+        pending = []
+        pending_nodes = set()
+        done = 0
+
+        while done < size:
+            node = self.root
+            path = []
+            undos = []
+            while pool.first_child[node] >= 0 and pool.num_children[node] and not game.winner:
+                node = self._select_child(node)
+                path.append((node, 1.0 if game.current_player_index == 0 else -1.0))
+                undos.append(game.make_move(pool.move[node]))
+            self.nodes += len(path)
+
+            if node in pending_nodes:  # Virtual loss did not steer this simulation elsewhere
+                for undo in reversed(undos):
+                    game.unmake_move(undo)
+                break
+            done += 1
+
+            exact = self.tablebase.score(game) if self.tablebase is not None and path and not game.winner else None
+            if exact is not None:
+                self._backup(path, exact)
+            elif game.winner or pool.first_child[node] >= 0:
+                # Terminal, or a side left without moves, which scores as a draw
+                self._backup(path, terminal_value(game) if game.winner else 0.0)
+            else:
+                moves = self._root_moves if node == self.root and self._root_moves else game.get_possible_moves()
+                evaluator.encode(game, len(pending))
+                pending.append((node, path, moves))
+                pending_nodes.add(node)
+                self._add_virtual_loss(path)
+            for undo in reversed(undos):
+                game.unmake_move(undo)
+
+        if not pending:
+            return done
+        if self.use_policy:
+            values, logits = evaluator.evaluate_policy_buffer(len(pending))
+        else:
+            values, logits = evaluator.evaluate_buffer(len(pending)), None
+
+        for row, ((node, path, moves), value) in enumerate(zip(pending, values)):
+            if logits is not None and moves:
+                scores = logits[row, [move_action(move) for move in moves]]
+                priors = np.exp(scores - scores.max())
+                priors = (priors / priors.sum()).tolist()
+            else:
+                priors = repeat(1.0 / max(len(moves), 1), len(moves))
+            pool.first_child[node] = pool.allocate(moves, priors)
+            pool.num_children[node] = len(moves)
+            self._resolve_virtual_loss(path, value)
+        return done
+
+    def _backup(self, path, value):
+        """Counts a finished simulation on its path, adding a player-0 value to each node from its mover's side."""
+        visits, value_sum = self.pool.visits, self.pool.value_sum
+        visits[self.root] += 1
+        for node, sign in path:
+            visits[node] += 1
+            value_sum[node] += sign * value
+
+    def _add_virtual_loss(self, path):
+        """Counts a pending simulation as a loss for every mover on its path until its leaf is evaluated."""
+        visits, value_sum = self.pool.visits, self.pool.value_sum
+        visits[self.root] += 1
+        for node, _ in path:
+            visits[node] += 1
+            value_sum[node] -= 1.0
+
+    def _resolve_virtual_loss(self, path, value):
+        """Replaces a pending simulation's virtual loss with its evaluated value."""
+        value_sum = self.pool.value_sum
+        for node, sign in path:
+            value_sum[node] += sign * value + 1.0
@@ -0,0 +1,134 @@
+import fcntl
+import json
+import os
+
+import numpy as np
+
+from encoding import FEATURE_SIZE
+from move import NUM_ACTIONS
+
+
+class ReplayBuffer:
+    """
+    On-disk ring buffer of training positions built on numpy.memmap, so millions of positions
+    survive across runs without being loaded into memory. Each record holds the encoded position
+    (bit-packed, as the features are 0/1), the value target, the policy target over NUM_ACTIONS
+    (float16) and the id of the game it came from. The policy file, by far the largest, is only
+    allocated once a game with policy targets is appended; until then reads return None policies.
+    Appends from several processes are serialized with a file lock; once full, new records
+    overwrite the oldest.
+    """
+
+    def __init__(self, path, capacity=1_000_000, feature_size=FEATURE_SIZE, policy_size=NUM_ACTIONS):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as meta_file:
+                meta = json.load(meta_file)
+            capacity, feature_size, policy_size = meta["capacity"], meta["feature_size"], meta["policy_size"]
+            mode = "r+"
+        else:
+            mode = "w+"
+        self.capacity = capacity
+        self.feature_size = feature_size
+        self.policy_size = policy_size
+        packed_size = (feature_size + 7) // 8
+
+        # header[0]: records ever appended, header[1]: next game id
+        self.header = self._open("header", np.int64, (2,), mode)
+        self.states = self._open("states", np.uint8, (capacity, packed_size), mode)
+        self.values = self._open("values", np.float32, (capacity,), mode)
+        self.policies = None
+        self._policy_array()
+        self.game_ids = self._open("game_ids", np.int64, (capacity,), mode)
+        self.priorities = self._open("priorities", np.float32, (capacity,), mode)
+        self._lock_path = os.path.join(path, "lock")
+
+        if mode == "w+":
+            with open(meta_path + ".tmp", "w") as meta_file:
+                json.dump({"capacity": capacity, "feature_size": feature_size, "policy_size": policy_size}, meta_file)
+            os.replace(meta_path + ".tmp", meta_path)
+
+    def _open(self, name, dtype, shape, mode):
+        return np.memmap(os.path.join(self.path, name + ".bin"), dtype=dtype, mode=mode, shape=shape)
+
+    def _policy_array(self, create=False):
+        """Maps the policy file once it exists (possibly created by another process), or creates it."""
+        if self.policies is None and self.policy_size:
+            path = os.path.join(self.path, "policies.bin")
+            shape = (self.capacity, self.policy_size)
+            if os.path.exists(path):
+                self.policies = np.memmap(path, dtype=np.float16, mode="r+", shape=shape)
+            elif create:  # Under the append lock; renamed into place so other processes never map it half-sized
+                self.policies = np.memmap(path + ".tmp", dtype=np.float16, mode="w+", shape=shape)
+                os.replace(path + ".tmp", path)
+        return self.policies
+
+    def __len__(self):
+        return int(min(self.header[0], self.capacity))
+
+    @property
+    def total_appended(self):
+        return int(self.header[0])
+
+    def append_game(self, states, value_targets, policy_targets=None, priority=1.0):
+        """Appends the positions of one game and returns the game id assigned to them."""
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                game_id = int(self.header[1])
+                self.header[1] = game_id + 1
+                self._write(states, value_targets, policy_targets, game_id, priority)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return game_id
+
+    def _write(self, states, value_targets, policy_targets, game_id, priority):
+        count = len(states)
+        start = int(self.header[0])
+        slots = (start + np.arange(count)) % self.capacity
+        self.states[slots] = np.packbits(np.asarray(states) > 0.5, axis=1, bitorder="little")
+        self.values[slots] = value_targets
+        policies = self._policy_array(create=policy_targets is not None)
+        if policies is not None:
+            policies[slots] = policy_targets if policy_targets is not None else 0  # Clear overwritten targets
+        self.game_ids[slots] = game_id
+        self.priorities[slots] = priority
+        self.header[0] = start + count
+
+    def sample(self, batch_size, rng=None, prioritized=False, alpha=0.6):
+        """
+        Draws a batch uniformly (or proportionally to priority ** alpha) and returns
+        (states, values, policies, game_ids, indices), with states unpacked to float32.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        size = len(self)
+        if prioritized:
+            weights = self.priorities[:size].astype(np.float64) ** alpha
+            indices = rng.choice(size, batch_size, p=weights / weights.sum())
+        else:
+            indices = rng.integers(0, size, batch_size)
+        return self.gather(indices)
+
+    def gather(self, indices):
+        """Returns (states, values, policies, game_ids, indices) for the given record indices."""
+        states = np.unpackbits(self.states[indices], axis=1, count=self.feature_size, bitorder="little")
+        policies = self._policy_array()
+        return (states.astype(np.float32), self.values[indices],
+                None if policies is None else policies[indices].astype(np.float32), self.game_ids[indices], indices)
+
+    def read(self, start, stop):
+        """Returns (states, values, policies) of the contiguous records start:stop, reading them sequentially."""
+        states = np.unpackbits(self.states[start:stop], axis=1, count=self.feature_size, bitorder="little")
+        policies = self._policy_array()
+        return states, self.values[start:stop], None if policies is None else policies[start:stop]
+
+    def update_priorities(self, indices, priorities):
+        """Sets new sampling priorities, e.g. from the latest training losses."""
+        self.priorities[indices] = priorities
+
+    def flush(self):
+        for array in (self.header, self.states, self.values, self.policies, self.game_ids, self.priorities):
+            if array is not None:
+                array.flush()
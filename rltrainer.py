@@ -1,25 +1,239 @@
+import time
+
+import numpy as np
 import torch
 
+from bitboard import BitBoard
+from checkpoint import CheckpointManager
+from encoding import FEATURE_SIZE
+from evalcache import CachedEvaluator
+from evaluator import ModelEvaluator, terminal_value
+from gamerecord import GameRecord, GameRecordWriter
 from octigame import OctiGame
 from octinet import OctiNet
+from player import Player
 from playerai import OctiAIPlayer
+from replaybuffer import ReplayBuffer
+
+
+def play_self_play_game(players, max_moves=100, tablebase=None, random_plies=0, rng=None):
+    """
+    Plays one headless game between two AI players, ending it early once a tablebase solves the position.
+    The first `random_plies` moves are drawn uniformly from the legal moves with `rng`, so that
+    deterministic searches do not replay one game over and over. A side left without a legal move
+    ends the game in a draw.
+    Returns the encoded positions, the outcome from player 0's side (+1 win, -1 loss, 0 draw) and the
+    GameRecord of the game, with the search value and node count of every move (0 for random ones) and,
+    when a player reports them (OctiMCTSPlayer), the root visit counts of its searches.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    game = OctiGame(players[0], players[1], BitBoard(), max_moves=max_moves, observer=None)
+    states = np.empty((max_moves, FEATURE_SIZE), dtype=np.float32)
+    values = np.zeros(max_moves, dtype=np.float32)
+    nodes = np.zeros(max_moves, dtype=np.int64)
+    policies = []
+
+    outcome = None
+    while not game.winner:
+        if game.ply < random_plies:
+            moves = game.get_possible_moves()
+            move = moves[rng.integers(len(moves))] if moves else None
+            policy = None
+        else:
+            player = game.get_current_player()
+            move = player.choose_move(game)
+            values[game.ply], nodes[game.ply] = player.last_score, player.nodes
+            policy = player.root_visits() if hasattr(player, "root_visits") else None
+        if move is None:
+            outcome = 0.0
+            break
+        game.board.to_vector(game.current_player_index, out=states[game.ply])
+        policies.append(policy)
+        game.moves.append(move)  # The search only returns legal moves, so skip play_turn's check
+        game.make_move(move)
+        if tablebase is not None and not game.winner:
+            result = tablebase.result(game)
+            if result is not None:
+                outcome = result[0]
+                break
+
+    if outcome is None:
+        outcome = terminal_value(game)
+    if any(policy is not None for policy in policies):
+        policies = [policy or {} for policy in policies]
+    else:
+        policies = None
+    record = GameRecord(list(game.moves), outcome, values[:game.ply], nodes[:game.ply], max_moves, policies)
+    return states[:game.ply], outcome, record
+
+
+class ArrayDataset:
+    """In-memory (states, values[, policies]) arrays exposing the read() interface of ReplayBuffer."""
+
+    def __init__(self, states, values, policies=None):
+        self.states = np.asarray(states, dtype=np.float32)
+        self.values = np.asarray(values, dtype=np.float32)
+        self.policies = None if policies is None else np.asarray(policies, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.values)
+
+    def read(self, start, stop):
+        policies = None if self.policies is None else self.policies[start:stop]
+        return self.states[start:stop], self.values[start:stop], policies
+
 
 class RLTrainer:
     def __init__(self, model, learning_rate=0.001):
         self.model = model
         self.optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
         self.loss_fn = torch.nn.MSELoss()
+        self._batch_states = None
+        self._batch_targets = None
+        self._batch_policies = None
+        self.steps = 0  # Optimizer steps and samples trained on, recorded in checkpoints
+        self.samples_seen = 0
 
     def train_step(self, board_state, target):
         self.optimizer.zero_grad()
-        prediction = self.model(torch.tensor(board_state, dtype=torch.float32))
-        loss = self.loss_fn(prediction, torch.tensor(target, dtype=torch.float32))
+        prediction = self.model(torch.as_tensor(board_state, dtype=torch.float32))
+        loss = self.loss_fn(prediction.view(-1), torch.tensor([target], dtype=torch.float32))
         loss.backward()
         self.optimizer.step()
         return loss.item()
 
-    def train_from_games(self, game_history):
+    def _batch_tensors(self, batch_size, feature_size):
+        """Returns input/target tensors reused across batches (pinned when a GPU could consume them)."""
+        if self._batch_states is None or self._batch_states.shape != (batch_size, feature_size):
+            pin = torch.cuda.is_available()
+            self._batch_states = torch.empty((batch_size, feature_size), dtype=torch.float32, pin_memory=pin)
+            self._batch_targets = torch.empty((batch_size, 1), dtype=torch.float32, pin_memory=pin)
+            if self.model.has_policy:
+                self._batch_policies = torch.empty((batch_size, self.model.policy.out_features), dtype=torch.float32,
+                                                   pin_memory=pin)
+        return self._batch_states, self._batch_targets, self._batch_policies
+
+    def train_epoch(self, buffer, batch_size=256, epochs=1, rng=None, verbose=True, block_size=32):
+        """
+        Trains on every record of `buffer` (a ReplayBuffer or ArrayDataset) for `epochs` passes.
+        The records are cut into contiguous blocks of `block_size`, each read in one go, at boundaries
+        shifted randomly every epoch; a batch joins batch_size // block_size blocks drawn in shuffled
+        order, so it mixes positions of many games instead of one game's consecutive plies. A model
+        with a policy head also learns the stored policy targets (records without one contribute no
+        policy loss). Returns the per-batch loss curve, the per-epoch mean losses and samples/sec.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        size = len(buffer)
+        block_size = max(1, min(block_size, batch_size))
+        blocks_per_batch = batch_size // block_size
+        losses, epoch_losses = [], []
+        samples = 0
+        started = time.perf_counter()
+        self.model.train()
+
+        for epoch in range(epochs):
+            epoch_start = len(losses)
+            offset = int(rng.integers(0, block_size)) if size > block_size else 0  # Vary block boundaries
+            starts = np.arange(offset, size, block_size)
+            if offset:
+                starts = np.concatenate(([0], starts))  # The short leading block [0, offset)
+            stops = np.append(starts[1:], size)
+            order = rng.permutation(len(starts))
+            for first in range(0, len(order), blocks_per_batch):
+                blocks = [buffer.read(starts[i], stops[i]) for i in order[first:first + blocks_per_batch]]
+                states = np.concatenate([block[0] for block in blocks])
+                values = np.concatenate([block[1] for block in blocks])
+                policies = None
+                if all(block[2] is not None for block in blocks):
+                    policies = np.concatenate([block[2] for block in blocks])
+                count = len(values)
+                batch_states, batch_targets, batch_policies = self._batch_tensors(batch_size, states.shape[1])
+                batch_states[:count].copy_(torch.from_numpy(np.ascontiguousarray(states, dtype=np.float32)))
+                batch_targets[:count, 0].copy_(torch.from_numpy(np.asarray(values, dtype=np.float32)))
+
+                self.optimizer.zero_grad()
+                if batch_policies is not None and policies is not None:
+                    batch_policies[:count].copy_(torch.from_numpy(np.asarray(policies, dtype=np.float32)))
+                    value, logits = self.model.forward_policy(batch_states[:count])
+                    # Cross-entropy against the visit distributions; all-zero targets add nothing
+                    policy_loss = -(batch_policies[:count] * torch.log_softmax(logits, dim=1)).sum(dim=1).mean()
+                    loss = self.loss_fn(value, batch_targets[:count]) + policy_loss
+                else:
+                    loss = self.loss_fn(self.model(batch_states[:count]), batch_targets[:count])
+                loss.backward()
+                self.optimizer.step()
+                losses.append(loss.item())
+                samples += count
+                self.steps += 1
+                self.samples_seen += count
+
+            epoch_losses.append(float(np.mean(losses[epoch_start:])) if len(losses) > epoch_start else 0.0)
+            if verbose:
+                elapsed = time.perf_counter() - started
+                print(f"epoch {epoch + 1}/{epochs}: loss {epoch_losses[-1]:.4f}, {samples / elapsed:,.0f} samples/s")
+
+        self.model.eval()
+        elapsed = time.perf_counter() - started
+        return {"losses": losses, "epoch_losses": epoch_losses, "samples_per_sec": samples / max(elapsed, 1e-9)}
+
+    def train_from_games(self, game_history, batch_size=256):
         """Train AI from past self-play games."""
-        for board_state, outcome in game_history:
-            target = outcome  # Target is game result (+1 win, -1 loss, 0 draw)
-            self.train_step(board_state, target)
+        if not game_history:
+            return None
+        # Target is game result (+1 win, -1 loss, 0 draw)
+        states, outcomes = zip(*game_history)
+        return self.train_epoch(ArrayDataset(np.stack(states), outcomes), batch_size, verbose=False)
+
+    def train(self, epochs=10, games_per_epoch=20, depth=2, batch_size=256, buffer_path="replay_buffer",
+              checkpoint_dir="checkpoints", record_path=None, random_plies=4, seed=None):
+        """
+        Alternates self-play with the current model and batched training on the replay buffer,
+        resuming from the latest checkpoint generation and saving a new one after every epoch.
+        Every game opens with `random_plies` random moves. With record_path, every game is also
+        appended to that game-record file.
+        """
+        checkpoints = CheckpointManager(checkpoint_dir)
+        self.resume(checkpoints)
+        buffer = ReplayBuffer(buffer_path)
+        evaluator = CachedEvaluator(ModelEvaluator(self.model))  # Shared by both players and across games
+        players = [OctiAIPlayer("AI1", self.model, depth=depth, evaluator=evaluator),
+                   OctiAIPlayer("AI2", self.model, depth=depth, evaluator=evaluator)]
+
+        records = GameRecordWriter(record_path) if record_path else None
+        rng = np.random.default_rng(seed)
+
+        try:
+            for epoch in range(epochs):
+                self.model.eval()
+                for _ in range(games_per_epoch):
+                    states, outcome, record = play_self_play_game(players, random_plies=random_plies, rng=rng)
+                    buffer.append_game(states, np.full(len(states), outcome, dtype=np.float32))
+                    if records:
+                        records.append(record)
+                print(f"Epoch {epoch + 1}/{epochs}: {len(buffer)} positions in the replay buffer")
+                self.train_epoch(buffer, batch_size)
+                buffer.flush()
+                if records:
+                    records.flush()
+                generation = checkpoints.save(self.model, self.steps, self.samples_seen, optimizer=self.optimizer)
+                print(f"Saved generation {generation}")
+        finally:
+            if records:
+                records.close()
+
+    def resume(self, checkpoints):
+        """Loads the latest generation of a CheckpointManager, with its optimizer state and counters, if there is one."""
+        if checkpoints.latest_generation() is None:
+            return None
+        _, metadata = checkpoints.load(self.model, optimizer=self.optimizer)
+        self.steps, self.samples_seen = metadata["step"], metadata["samples"]
+        return metadata["generation"]
+
+    def play_vs_human(self, depth=3, time_ms=2000, checkpoint_dir="checkpoints"):
+        """Opens the GUI for a human (first player) against the latest trained generation, if any."""
+        from octigamegui import OctiGameGUI  # pygame is only needed for interactive play
+
+        self.resume(CheckpointManager(checkpoint_dir))
+        self.model.eval()
+        ai = OctiAIPlayer("AI", self.model, depth=depth, index=1)
+        OctiGameGUI(OctiGame(Player(0), ai), ai_time_ms=time_ms).run()
@@ -0,0 +1,362 @@
+import itertools
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+from bitboard import iter_squares
+from move import JUMP_TARGET, MAX_EXTRA_HOPS, NEIGHBOR
+
+# Stored values, from the side to move's view: n > 0 wins with its n-th move from here (counting both
+# sides' moves, so odd), -n loses to the opponent's move n plies from here (even), DRAW when neither side
+# can force a win, UNKNOWN for positions not solved (beyond a prong cap, or never reachable in a game)
+UNKNOWN = 0
+DRAW = -32768
+TABLE_VERSION = 2  # Version 1 indexed every prong set, even those beyond the cap
+
+_COMB = [[math.comb(n, k) for k in range(65)] for n in range(65)]
+_POPCOUNT = np.array([mask.bit_count() for mask in range(16)])
+_STRIP = np.array([mask & ~(1 << (mask.bit_length() - 1)) if mask else 0 for mask in range(16)])  # Last prong removed
+
+
+def signatures(max_pods):
+    """Returns the (player 0 pods, player 1 pods) material signatures of a table, fewest pods first."""
+    return [(pods, total - pods) for total in range(2, max_pods + 1) for pods in range(1, total)]
+
+
+def prong_codes(pods, max_prongs=None):
+    """
+    Returns (codes, ranks) for the prong sets of `pods` pods, 4 bits per pod: the sets within the
+    prong cap in increasing order, and each set's position among them (-1 beyond the cap).
+    A position's prong set is indexed by its rank, so a capped table holds no slots for the rest.
+    """
+    codes = np.arange(16 ** pods, dtype=np.int64)
+    if max_prongs is not None:
+        codes = codes[sum(_POPCOUNT[codes >> 4 * k & 15] for k in range(pods)) <= max_prongs]
+    ranks = np.full(16 ** pods, -1, dtype=np.int64)
+    ranks[codes] = np.arange(len(codes))
+    return codes, ranks
+
+
+def signature_size(signature, max_prongs=None):
+    """Number of index slots of a signature: pod squares of both players, prong sets within the cap, side to move."""
+    a, b = signature
+    return math.comb(64, a) * math.comb(64, b) * len(prong_codes(a + b, max_prongs)[0]) * 2
+
+
+def position_index(pods, prongs, side, prong_table):
+    """
+    Returns the index of a position within its signature's table, from pods and prongs bitmasks and
+    the (codes, ranks) of prong_codes for its number of pods.
+    """
+    rank = code = 0
+    for player in range(2):
+        squares = list(iter_squares(pods[player]))
+        rank = rank * _COMB[64][len(squares)] + sum(_COMB[square][i + 1] for i, square in enumerate(squares))
+        for square in squares:
+            code = (code << 4 | prongs[0] >> square & 1 | (prongs[1] >> square & 1) << 1
+                    | (prongs[2] >> square & 1) << 2 | (prongs[3] >> square & 1) << 3)
+    codes, ranks = prong_table
+    return (rank * len(codes) + int(ranks[code])) << 1 | side
+
+
+class Tablebase:
+    """
+    Exact values of positions with few pods, memory-mapped from a table built by build_tablebase.
+    The table is one int16 array of every signature's slots back to back, with prong sets indexed
+    by their rank within the prong cap; meta.json holds the signatures' offsets, the pod limit and
+    the prong cap it was built with.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json")) as meta_file:
+            meta = json.load(meta_file)
+        if meta.get("version", 1) != TABLE_VERSION:
+            raise ValueError(f"Tablebase in {path} was built with an older index layout; rebuild it")
+        self.max_pods = meta["max_pods"]
+        self.max_prongs = meta["max_prongs"]
+        self.offsets = {(a, b): offset for a, b, offset in meta["signatures"]}
+        self.prong_tables = {n: prong_codes(n, self.max_prongs) for n in range(2, self.max_pods + 1)}
+        self.values = np.memmap(os.path.join(path, "values.bin"), dtype=np.int16, mode="r")
+        self.hits = self.misses = 0
+
+    def probe(self, board, side):
+        """Returns the stored value of a position for the side to move, or None if the table does not solve it."""
+        counts = board.pod_counts
+        if counts[0] + counts[1] > self.max_pods or not counts[0] or not counts[1]:
+            return None
+        pods, prongs = board.pods, board.prongs
+        if self.max_prongs is not None and sum(mask.bit_count() for mask in prongs) > self.max_prongs:
+            self.misses += 1
+            return None
+        index = position_index(pods, prongs, side, self.prong_tables[counts[0] + counts[1]])
+        value = int(self.values[self.offsets[counts[0], counts[1]] + index])
+        if value == UNKNOWN:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def result(self, game):
+        """
+        Returns (outcome from player 0's side: +1, -1 or 0, plies to the win or None) if the table solves
+        the game's position. A win the game's max_moves draw rule would cut short is not solved.
+        """
+        side = game.current_player_index
+        value = self.probe(game.board, side)
+        if value is None:
+            return None
+        if value == DRAW:
+            return 0.0, None
+        if game.ply + abs(value) > game.max_moves:
+            return None
+        outcome = 1.0 if value > 0 else -1.0
+        return (outcome if side == 0 else -outcome), abs(value)
+
+    def score(self, game):
+        """Returns a search score from player 0's side, shorter wins scoring higher, or None."""
+        result = self.result(game)
+        if result is None:
+            return None
+        outcome, plies = result
+        return outcome * (1.0 - 1e-4 * plies) if plies else outcome
+
+    def best_move(self, game):
+        """
+        Returns (move, score for the side to move) of the fastest win, or slowest loss, when the table
+        solves the position, else None. Visit-count searches need this at the root: every winning move
+        looks alike to them, and picking any of them need not make progress.
+        """
+        side = game.current_player_index
+        if self.result(game) is None:
+            return None
+        sign = 1.0 if side == 0 else -1.0
+        best = None
+        for move in game.get_possible_moves():
+            undo = game.make_move(move)
+            if game.winner:
+                score = 0.0 if game.winner == "DRAW" else 1.0
+            else:
+                score = self.score(game)
+                score = sign * score if score is not None else None
+            game.unmake_move(undo)
+            if score is not None and (best is None or score > best[1]):
+                best = move, score
+        return best
+
+
+def build_tablebase(path, max_pods=2, max_prongs=None, verbose=True):
+    """
+    Solves every position with at most `max_pods` pods (at least one each) and at most `max_prongs`
+    prongs by retrograde analysis and writes the table to the `path` directory.
+
+    Successors are generated one placement of the pods at a time, for all its prong sets at once with
+    NumPy, mirroring movegen and OctiGame.make_move (bench.py check verifies the result against them).
+    The values are then found in rounds of increasing distance: wins in 1, positions whose every
+    move allows a win in 1, positions with a move to those, and so on. Positions left unresolved are
+    draws, or UNKNOWN when a prong cap hides some of their successors (a capped table only proves
+    wins, and losses whose every successor is in the table). Captures that take a pod lead into
+    signatures solved earlier. Two pods solve in seconds; three need a prong cap (two prongs take
+    a few minutes).
+    """
+    os.makedirs(path, exist_ok=True)
+    table_signatures = signatures(max_pods)
+    prong_tables = {n: prong_codes(n, max_prongs) for n in range(2, max_pods + 1)}
+    offsets, total = {}, 0
+    for signature in table_signatures:
+        offsets[signature] = total
+        total += signature_size(signature, max_prongs)
+    values = np.memmap(os.path.join(path, "values.bin.tmp"), dtype=np.int16, mode="w+", shape=(total,))
+    closed = max_prongs is None
+
+    for signature in table_signatures:
+        started = time.perf_counter()
+        indices, wins_now, counts, children = _successors(signature, prong_tables, offsets)
+        size = signature_size(signature, max_prongs)
+        solved = _solve(signature, size, indices, wins_now, counts, children, offsets, values, closed)
+        values[offsets[signature] + indices] = solved
+        if verbose:
+            wins, losses = int((solved > 0).sum()), int(((solved < 0) & (solved != DRAW)).sum())
+            print(f"{signature}: {len(indices)} positions, {wins} wins, {losses} losses, "
+                  f"longest {int(np.abs(solved[solved != DRAW]).max(initial=0))} plies, "
+                  f"{time.perf_counter() - started:.1f}s")
+
+    values.flush()
+    del values
+    os.replace(os.path.join(path, "values.bin.tmp"), os.path.join(path, "values.bin"))
+    meta = {"version": TABLE_VERSION, "max_pods": max_pods, "max_prongs": max_prongs,
+            "signatures": [[a, b, offsets[a, b]] for a, b in table_signatures]}
+    with open(os.path.join(path, "meta.json.tmp"), "w") as meta_file:
+        json.dump(meta, meta_file)
+    os.replace(os.path.join(path, "meta.json.tmp"), os.path.join(path, "meta.json"))
+
+
+def _pod_moves(squares, a, side):
+    """
+    Yields the moves of the side to move's pods on fixed squares (pods of player 0 first), mirroring
+    movegen: ("prong", pod, direction bit) for a prong addition, which needs the bit unset, and
+    ("move", pod, direction bits, end square, captured pods) for steps, jumps and jump chains,
+    which need every direction they hop in.
+    """
+    occupied = set(squares)
+    own = range(a) if side == 0 else range(a, len(squares))
+    for pod in own:
+        start = squares[pod]
+        for d in range(4):
+            yield "prong", pod, 1 << d
+            target = NEIGHBOR[start][d]
+            if target >= 0 and target not in occupied:
+                yield "move", pod, 1 << d, target, ()
+        others = occupied - {start}
+        yield from _chains(squares, a, side, pod, start, 0, others, {start}, (), 0)
+
+
+def _chains(squares, a, side, pod, square, directions, occupied, visited, jumped, hops):
+    """Yields the jump chains of a pod continuing from a square, never revisiting a landing or re-jumping a pod."""
+    if hops > MAX_EXTRA_HOPS:
+        return
+    for d in range(4):
+        landing, middle = JUMP_TARGET[square][d], NEIGHBOR[square][d]
+        if landing < 0 or middle not in occupied or landing in occupied or landing in visited or middle in jumped:
+            continue
+        chain = jumped + (middle,)
+        captured = tuple(squares.index(m) for m in chain if (squares.index(m) < a) != (side == 0))
+        yield "move", pod, directions | 1 << d, landing, captured
+        yield from _chains(squares, a, side, pod, landing, directions | 1 << d, occupied, visited | {landing},
+                           chain, hops + 1)
+
+
+def _indices_of(pods, side, offsets, prong_tables):
+    """Global indices of positions given as (square, owner, prong digits per combination) pods."""
+    rank = 0
+    code = 0
+    ordered = []
+    for player in range(2):
+        own = sorted((square, digits) for square, owner, digits in pods if owner == player)
+        rank = rank * _COMB[64][len(own)] + sum(_COMB[square][i + 1] for i, (square, _) in enumerate(own))
+        ordered += own
+    for _, digits in ordered:
+        code = code << 4 | digits
+    counts = tuple(sum(1 for _, owner, _ in pods if owner == player) for player in range(2))
+    codes, ranks = prong_tables[len(pods)]
+    return offsets[counts] + ((rank * len(codes) + ranks[code]) << 1 | side)
+
+
+def _successors(signature, prong_tables, offsets):
+    """
+    Generates every position of a signature that can occur in a game (no pod already on its goal row)
+    and its moves' results, handling all prong sets of one placement of the pods at once.
+    Returns the positions' indices within the signature, whether the side to move wins with one move,
+    its number of other moves and their successors' global indices (-1 beyond the prong cap), grouped
+    by position.
+    """
+    a, b = signature
+    n = a + b
+    combos, ranks = prong_tables[n]  # Prong sets of all pods within the cap, 4 bits per pod
+    slots = np.arange(len(combos))
+    digits = [combos >> 4 * (n - 1 - k) & 15 for k in range(n)]
+    offset = offsets[signature]
+    indices, wins_now, counts, children = [], [], [], []
+
+    for squares0 in itertools.combinations(range(56), a):
+        for squares1 in itertools.combinations([s for s in range(8, 64) if s not in squares0], b):
+            squares = squares0 + squares1
+            rank = (sum(_COMB[s][i + 1] for i, s in enumerate(squares0)) * _COMB[64][b]
+                    + sum(_COMB[s][i + 1] for i, s in enumerate(squares1))) * len(combos)
+            pods = [(square, 0 if k < a else 1, digits[k]) for k, square in enumerate(squares)]
+            for side in range(2):
+                goal_row = 7 if side == 0 else 0
+                won = np.zeros(len(combos), dtype=bool)
+                parents, targets = [], []
+                for move in _pod_moves(squares, a, side):
+                    if move[0] == "prong":
+                        _, pod, bit = move
+                        legal = digits[pod] & bit == 0
+                        child_slots = ranks[combos[legal] + (bit << 4 * (n - 1 - pod))]
+                        parents.append(np.flatnonzero(legal))
+                        targets.append(np.where(child_slots >= 0, offset + ((rank + child_slots) << 1 | 1 - side), -1))
+                        continue
+
+                    _, pod, bits, end, captured = move
+                    legal = digits[pod] & bits == bits
+                    if end // 8 == goal_row:
+                        won |= legal
+                        continue
+                    moved = list(pods)
+                    moved[pod] = (end, side, digits[pod])
+                    # A captured pod loses its last prong (in N, S, E, W order), and is removed once it has none
+                    removed = np.zeros(len(combos), dtype=np.int64)
+                    for j, victim in enumerate(captured):
+                        moved[victim] = (squares[victim], 1 - side, _STRIP[digits[victim]])
+                        removed |= (_POPCOUNT[digits[victim]] <= 1).astype(np.int64) << j
+                    for pattern in np.unique(removed[legal]):
+                        subset = legal & (removed == pattern)
+                        gone = {victim for j, victim in enumerate(captured) if pattern >> j & 1}
+                        left = [moved[k] for k in range(n) if k not in gone]
+                        if not any(owner != side for _, owner, _ in left):
+                            won |= subset
+                            continue
+                        parents.append(np.flatnonzero(subset))
+                        targets.append(_indices_of(left, 1 - side, offsets, prong_tables)[subset])
+
+                parents, targets = np.concatenate(parents), np.concatenate(targets)
+                keep = ~won[parents]
+                parents, targets = parents[keep], targets[keep]
+                order = np.argsort(parents, kind="stable")
+                indices.append((rank + slots) << 1 | side)
+                wins_now.append(won)
+                counts.append(np.bincount(parents, minlength=len(combos)))
+                children.append(targets[order])
+
+    return np.concatenate(indices), np.concatenate(wins_now), np.concatenate(counts), np.concatenate(children)
+
+
+def _solve(signature, size, indices, wins_now, counts, children, offsets, values, closed):
+    """
+    Retrograde rounds over one signature's `size` slots of positions; successors in other signatures
+    are read from `values`, and those beyond the prong cap (index -1) are UNKNOWN.
+    """
+    n = len(indices)
+    offset = offsets[signature]
+    order = np.argsort(indices)
+    sorted_indices = indices[order]
+
+    # Successor references into ext: this signature's positions first, then fixed values of the others
+    local = (children >= offset) & (children < offset + size)
+    position = np.searchsorted(sorted_indices, children[local] - offset).clip(max=n - 1)
+    found = sorted_indices[position] == children[local] - offset
+    fixed = np.full(len(children), UNKNOWN, dtype=np.int16)  # Beyond the prong cap unless set below
+    other = ~local & (children >= 0)
+    fixed[other] = values[children[other]]
+    refs = n + np.arange(len(children))
+    local_refs = refs[local]
+    local_refs[found] = order[position[found]]
+    refs[local] = local_refs
+    ext = np.concatenate((np.zeros(n, dtype=np.int16), fixed))
+
+    solved = np.zeros(n, dtype=np.int16)
+    solved[wins_now] = 1
+    solved[(counts == 0) & ~wins_now] = DRAW  # A side without moves cannot make progress
+    moving = counts > 0
+    starts = (np.cumsum(counts) - counts)[moving]
+    distance = 1
+    while distance < 32767:
+        distance += 1
+        ext[:n] = solved
+        child_values = ext[refs]
+        undecided = solved[moving] == UNKNOWN
+        if distance % 2:  # A move to a position lost in distance - 1
+            decided = undecided & np.logical_or.reduceat(child_values == 1 - distance, starts)
+            value = distance
+        else:  # Every move allows a win; the slowest one was decided last round
+            decided = undecided & np.logical_and.reduceat(child_values > 0, starts)
+            value = -distance
+        if not decided.any():
+            break
+        solved[np.flatnonzero(moving)[decided]] = value
+
+    if closed:
+        solved[solved == UNKNOWN] = DRAW
+    return solved
@@ -0,0 +1,52 @@
+import random
+
+import numpy as np
+
+from bitboard import BitBoard
+from gamerecord import GameRecord, GameRecordWriter, read_games, replay_game
+from move import NUM_ACTIONS
+from octigame import OctiGame
+from player import Player
+
+
+def play_random_game(rng):
+    game = OctiGame(Player(0), Player(1), BitBoard(), observer=None)
+    while not game.winner:
+        game.play_turn(rng.choice(game.get_possible_moves()))
+    return game
+
+
+def test_records_round_trip_and_replay(tmp_path):
+    """
+    Writes random games (with random search values, node counts and root visit counts on some) in
+    small flushes, streams them back in small chunks and checks every record and its replay.
+    """
+    rng = random.Random(0)
+    path = tmp_path / "games.rec"
+    played, written = [], []
+    with GameRecordWriter(path, buffer_bytes=1024) as writer:
+        for i in range(50):
+            game = play_random_game(rng)
+            count = len(game.moves)
+            values = np.float16([rng.uniform(-1, 1) for _ in range(count)]) if i % 2 else None
+            nodes = [rng.randrange(1 << 20) for _ in range(count)] if i % 3 else None
+            policies = None
+            if i % 5:
+                policies = [{rng.randrange(NUM_ACTIONS): rng.randrange(1, 1000) for _ in range(rng.randrange(4))}
+                            for _ in range(count)]
+            outcome = 0 if game.winner == "DRAW" else 1 if game.winner is game.players[0] else -1
+            record = GameRecord(list(game.moves), outcome, values, nodes, game.max_moves, policies)
+            writer.append(record)
+            played.append(game)
+            written.append(record)
+
+    for game, expected, record in zip(played, written, read_games(path, chunk_bytes=100), strict=True):
+        assert record.moves == expected.moves and record.outcome == expected.outcome
+        assert record.max_moves == expected.max_moves
+        assert record.policies == expected.policies
+        for field in ("values", "nodes"):
+            want, got = getattr(expected, field), getattr(record, field)
+            assert (want is None) == (got is None) and (want is None or np.array_equal(want, got)), field
+        replayed = replay_game(record)
+        assert replayed.hash == game.hash and replayed.ply == game.ply
+        assert getattr(replayed.winner, "index", replayed.winner) == getattr(game.winner, "index", game.winner)
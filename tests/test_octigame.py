@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from bitboard import BitBoard
+from board import Board, DIRECTION_ORDER
+from move import JUMP_MOVES, PRONG, PRONG_MOVES, STEP_MOVES, format_move, move_direction, move_kind, move_to
+from octigame import OctiGame
+from player import Player
+from zobrist import board_key
+
+
+def snapshot(game):
+    """Returns a comparable copy of every piece of state make_move can touch."""
+    board = game.board
+    squares = tuple((board.owner(square), board.prong_mask(square)) for square in range(64))
+    return squares, game.winner, game.ply, game.current_player_index, game.hash
+
+
+def rebuild_board(game):
+    """Copies the game position into a fresh dict Board."""
+    board = Board()
+    for square in range(64):
+        owner = game.board.owner(square)
+        if owner is not None:
+            prongs = [name for d, name in enumerate(DIRECTION_ORDER) if game.board.prong_mask(square) >> d & 1]
+            board.place_pod(divmod(square, 8), game.players[owner], prongs)
+    return board
+
+
+@pytest.mark.parametrize("board_class", [BitBoard, Board])
+def test_make_unmake_restores_every_move(board_class):
+    """Plays random games, checking that unmake_move restores the exact state after every legal make_move."""
+    rng = random.Random(0)
+    for _ in range(10):
+        game = OctiGame(Player(0), Player(1), board_class(), max_moves=rng.randint(20, 120), observer=None)
+        while not game.winner:
+            before = snapshot(game)
+            moves = game.get_possible_moves()
+            for move in moves:
+                undo = game.make_move(move)
+                if board_class is BitBoard:
+                    reference = rebuild_board(game)
+                    assert game.board.hash == board_key(game.board.pods, game.board.prongs), (move, game.ply)
+                    assert game.board.pod_counts == reference.pod_counts, (move, game.ply)
+                    assert game.board.free_prongs == reference.free_prongs, (move, game.ply)
+                game.unmake_move(undo)
+                assert snapshot(game) == before, (move, game.ply)
+            if not moves:
+                break
+            game.make_move(rng.choice(moves))
+
+
+def test_movegen_matches_board_rules():
+    """Checks the generator's single-hop moves against what Board.move_pod and Board.add_prong accept."""
+    rng = random.Random(0)
+    for _ in range(5):
+        game = OctiGame(Player(0), Player(1), BitBoard(), observer=None)
+        while not game.winner:
+            generated = set(game.get_possible_moves())
+            for start in range(64):
+                if game.board.owner(start) != game.current_player_index:
+                    continue
+                for move in STEP_MOVES[start] + JUMP_MOVES[start] + PRONG_MOVES[start]:
+                    if move is None:
+                        continue
+                    board = rebuild_board(game)
+                    try:
+                        if move_kind(move) == PRONG:
+                            board.add_prong(divmod(start, 8), DIRECTION_ORDER[move_direction(move)])
+                        else:
+                            board.move_pod(divmod(start, 8), divmod(move_to(move), 8))
+                        accepted = True
+                    except ValueError:
+                        accepted = False
+                    assert accepted == (move in generated), format_move(move)
+            game.make_move(rng.choice(list(generated)))
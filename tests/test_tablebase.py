@@ -0,0 +1,46 @@
+import random
+
+from bitboard import BitBoard
+from octigame import OctiGame
+from player import Player
+from tablebase import DRAW, Tablebase, build_tablebase
+
+
+def test_two_pod_values_follow_from_their_moves(tmp_path):
+    """
+    Solves the two-pod tablebase and checks sampled positions against OctiGame: each value must
+    follow from the game's own moves and the table's values after them.
+    """
+    build_tablebase(tmp_path, max_pods=2, verbose=False)
+    table = Tablebase(tmp_path)
+    rng = random.Random(0)
+    checked = 0
+    while checked < 500:
+        game = OctiGame(Player(0), Player(1), BitBoard(), max_moves=1 << 30, observer=None)
+        for square in range(64):
+            game.board.set_square(square, None, 0)
+        squares = rng.sample(range(64), 2)
+        if squares[0] // 8 == 7 or squares[1] // 8 == 0:  # A pod on its goal row has already won
+            continue
+        for player, square in enumerate(squares):
+            game.board.set_square(square, player, rng.randrange(16))
+        game.current_player_index = side = rng.randrange(2)
+
+        expected, losses, wins, moves = None, [], [], game.get_possible_moves()
+        for move in moves:
+            undo = game.make_move(move)
+            if game.winner:
+                expected = 1
+            else:
+                value = table.probe(game.board, 1 - side)
+                (losses if 0 > value != DRAW else wins if value > 0 else []).append(abs(value))
+            game.unmake_move(undo)
+        if expected is None:
+            if losses:
+                expected = min(losses) + 1
+            elif moves and len(wins) == len(moves):
+                expected = -(max(wins) + 1)
+            else:
+                expected = DRAW
+        assert table.probe(game.board, side) == expected, (squares, game.board.prongs, side)
+        checked += 1
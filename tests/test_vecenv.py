@@ -0,0 +1,47 @@
+import numpy as np
+
+from bitboard import BitBoard
+from move import ACTIONS_PER_SQUARE, JUMP_MOVES, PRONG_MOVES, STEP_MOVES, move_action, move_extra_hops
+from octigame import OctiGame
+from player import Player
+from vecenv import VecOctiEnv
+
+
+def fresh_game():
+    return OctiGame(Player(0), Player(1), BitBoard(), max_moves=60, observer=None)
+
+
+def test_vecenv_matches_octigame():
+    """Plays random single-hop games in VecOctiEnv and in OctiGame side by side, checking they never disagree."""
+    num_games = 16
+    rng = np.random.default_rng(0)
+    env = VecOctiEnv(num_games, max_moves=60)
+    games = [fresh_game() for _ in range(num_games)]
+    tables = (STEP_MOVES, JUMP_MOVES, PRONG_MOVES)
+    finished = 0
+    for _ in range(200):
+        legal = env.legal_actions()
+        features = env.encode()
+        actions = np.empty(num_games, dtype=np.int64)
+        for i, game in enumerate(games):
+            expected = sorted({move_action(move) for move in game.get_possible_moves() if not move_extra_hops(move)})
+            assert np.flatnonzero(legal[i]).tolist() == expected, (i, game.ply)
+            assert np.array_equal(features[i], game.board.to_vector(game.current_player_index)), (i, game.ply)
+            actions[i] = rng.choice(expected)
+
+        rewards, dones = env.step(actions)
+        for i, game in enumerate(games):
+            square, rest = divmod(int(actions[i]), ACTIONS_PER_SQUARE)
+            game.make_move(tables[rest // 4][square][rest % 4])
+            stalled = game.winner is None and not game.get_possible_moves()
+            assert bool(dones[i]) == (game.winner is not None or stalled), (i, game.ply)
+            if dones[i]:
+                outcome = 0.0 if game.winner in ("DRAW", None) else 1.0 if game.winner is game.players[0] else -1.0
+                assert rewards[i] == outcome, i
+                games[i] = fresh_game()
+                finished += 1
+            else:
+                assert tuple(env.pods[i]) == tuple(game.board.pods), (i, game.ply)
+                assert tuple(env.prongs[i]) == tuple(game.board.prongs), (i, game.ply)
+                assert env.side[i] == game.current_player_index and env.ply[i] == game.ply, (i, game.ply)
+    assert finished > 0
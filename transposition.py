@@ -0,0 +1,122 @@
+from multiprocessing import shared_memory
+
+EXACT, LOWER, UPPER = range(3)
+
+# check word (Q), move + 1 (Q), score (d) and packed depth/bound/generation (Q) per entry
+ENTRY_BYTES = 32
+
+
+def table_size(max_bytes):
+    """Returns the number of entries (a power of two) of a table of at most max_bytes."""
+    size = 1
+    while size * 2 * ENTRY_BYTES <= max_bytes:
+        size *= 2
+    return size
+
+
+class TranspositionTable:
+    """
+    Fixed-size, direct-mapped table of search results keyed by Zobrist hash.
+    A slot is replaced when it is empty, holds the same position, was written by an older search
+    or holds a shallower (or equally deep) result.
+
+    The table lives in one flat buffer, which may be shared between processes (see create_shared
+    and attach_shared). Each slot stores key ^ move ^ score ^ meta instead of the key, so a slot
+    torn by concurrent writers fails the check on probe and reads as a miss, without locking.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, buffer=None):
+        size = table_size(max_bytes)
+        self.size = size
+        self.mask = size - 1
+        self.buffer = memoryview(buffer if buffer is not None else bytearray(size * ENTRY_BYTES))
+        words = self.buffer[:size * ENTRY_BYTES].cast("Q")
+        self.checks, self.moves, self._score_bits, self.meta = (words[i * size:(i + 1) * size] for i in range(4))
+        scratch = memoryview(bytearray(8))  # Reinterprets a score's 64 bits as a float and back
+        self._scratch_bits, self._scratch_score = scratch.cast("Q"), scratch.cast("d")
+        self.shared_memory = None
+        self.generation = 0
+        self.hits = self.misses = self.collisions = self.stores = self.replacements = 0
+
+    @classmethod
+    def create_shared(cls, max_bytes=16 * 1024 * 1024):
+        """Creates a table in a new shared memory block; other processes open it with attach_shared(name)."""
+        memory = shared_memory.SharedMemory(create=True, size=table_size(max_bytes) * ENTRY_BYTES)
+        memory.buf[:] = bytes(memory.size)
+        table = cls(max_bytes, memory.buf)
+        table.shared_memory = memory
+        return table
+
+    @classmethod
+    def attach_shared(cls, name, max_bytes=16 * 1024 * 1024):
+        """Opens a table created by create_shared in another process."""
+        memory = shared_memory.SharedMemory(name=name)
+        table = cls(max_bytes, memory.buf)
+        table.shared_memory = memory
+        return table
+
+    def new_search(self):
+        """Ages existing entries so the next search prefers replacing them."""
+        self.generation = (self.generation + 1) & 0xFFFF
+
+    def probe(self, key):
+        """Returns (depth, bound, score, move) stored for a position, or None."""
+        slot = key & self.mask
+        move, meta, bits = self.moves[slot], self.meta[slot], self._score_bits[slot]
+        stored = self.checks[slot] ^ move ^ meta ^ bits
+        if stored == key:
+            self.hits += 1
+            self._scratch_bits[0] = bits  # The score as read for the check, not a possibly newer write
+            return meta & 0xFF, meta >> 8 & 3, self._scratch_score[0], move - 1 if move else None
+        if stored:
+            self.collisions += 1
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        """Stores a search result if the replacement policy allows it."""
+        slot = key & self.mask
+        old_meta = self.meta[slot]
+        stored = self.checks[slot] ^ self.moves[slot] ^ old_meta ^ self._score_bits[slot]
+        if stored and stored != key:
+            if old_meta >> 10 == self.generation and old_meta & 0xFF > depth:
+                return
+            self.replacements += 1
+        move = move + 1 if move is not None else 0
+        meta = depth | bound << 8 | self.generation << 10
+        self._scratch_score[0] = score
+        bits = self._scratch_bits[0]
+        self.moves[slot] = move
+        self._score_bits[slot] = bits
+        self.meta[slot] = meta
+        self.checks[slot] = key ^ move ^ meta ^ bits
+        self.stores += 1
+
+    def clear(self):
+        self.buffer[:self.size * ENTRY_BYTES] = bytes(self.size * ENTRY_BYTES)
+        self.hits = self.misses = self.collisions = self.stores = self.replacements = 0
+
+    def close(self, unlink=False):
+        """Releases a shared table's views and memory block, unlinking it when this process created it."""
+        if self.shared_memory is None:
+            return
+        for view in (self.checks, self.moves, self._score_bits, self.meta, self.buffer):
+            view.release()
+        self.shared_memory.close()
+        if unlink:
+            self.shared_memory.unlink()
+        self.shared_memory = None
+
+    def stats(self):
+        """Returns the table's size and hit/miss/collision counters."""
+        probes = self.hits + self.misses
+        return {
+            "entries": self.size,
+            "bytes": self.size * ENTRY_BYTES,
+            "hits": self.hits,
+            "misses": self.misses,
+            "collisions": self.collisions,
+            "stores": self.stores,
+            "replacements": self.replacements,
+            "hit_rate": self.hits / probes if probes else 0.0,
+        }
@@ -0,0 +1,174 @@
+import numpy as np
+
+from bitboard import BOARD_SIZE, COL_0, COL_7, E, N, S
+from encoding import FEATURE_SIZE
+from move import ACTIONS_PER_SQUARE, JUMP, NUM_ACTIONS, PRONG, STEP
+
+OPPOSITE = (1, 0, 3, 2)
+SQUARE_DELTAS = np.array([-BOARD_SIZE, BOARD_SIZE, 1, -1])  # Per direction index N, S, E, W
+
+_ONE = np.uint64(1)
+_ZERO = np.uint64(0)
+_NOT_COL_0 = np.uint64(~COL_0 & ((1 << 64) - 1))
+_NOT_COL_7 = np.uint64(~COL_7 & ((1 << 64) - 1))
+# Starting pods of OctiGame._setup_pods: row 1 and row 6, columns 2-5, no prongs
+INITIAL_PODS = (sum(1 << (1 * BOARD_SIZE + col) for col in range(2, 6)),
+                sum(1 << (6 * BOARD_SIZE + col) for col in range(2, 6)))
+
+
+def shift(masks, direction):
+    """Array version of bitboard.shift: moves every bit of each uint64 mask one step in a direction index."""
+    if direction == N:
+        return masks >> np.uint64(BOARD_SIZE)
+    if direction == S:
+        return masks << np.uint64(BOARD_SIZE)
+    if direction == E:
+        return (masks << _ONE) & _NOT_COL_0
+    return (masks >> _ONE) & _NOT_COL_7
+
+
+def square_bits(masks):
+    """Expands an array of uint64 masks to a bool array with a trailing axis of 64 squares."""
+    as_bytes = np.ascontiguousarray(masks, dtype="<u8")[..., None].view(np.uint8)
+    return np.unpackbits(as_bytes, axis=-1, bitorder="little").astype(bool)
+
+
+class VecOctiEnv:
+    """
+    Many Octi games advanced together on NumPy arrays: per game, one uint64 mask per player's
+    pods and per prong direction, the side to move and the ply. Actions are move.move_action
+    indices of single-hop moves (steps, jumps and prong additions; no multi-jump chains), under
+    the rules of Board.move_pod/add_prong and OctiGame's victory and draw checks. A side to move
+    left without any legal action, which stalls an OctiGame, ends the game in a draw here.
+    """
+
+    def __init__(self, num_games, max_moves=100):
+        self.num_games = num_games
+        self.max_moves = max_moves
+        self.pods = np.zeros((num_games, 2), dtype=np.uint64)
+        self.prongs = np.zeros((num_games, 4), dtype=np.uint64)
+        self.side = np.zeros(num_games, dtype=np.int64)
+        self.ply = np.zeros(num_games, dtype=np.int64)
+        self.games_finished = 0
+        self.reset()
+
+    def __len__(self):
+        return self.num_games
+
+    def reset(self, games=None):
+        """Puts the selected games (a bool mask or indices, default all) back to the initial position."""
+        games = slice(None) if games is None else games
+        self.pods[games] = INITIAL_PODS
+        self.prongs[games] = 0
+        self.side[games] = 0
+        self.ply[games] = 0
+
+    def load_game(self, index, game):
+        """Copies an OctiGame's position into one of the games."""
+        self.pods[index] = game.board.pods
+        self.prongs[index] = game.board.prongs
+        self.side[index] = game.current_player_index
+        self.ply[index] = game.ply
+
+    def legal_actions(self):
+        """Returns the (num_games, NUM_ACTIONS) bool mask of the side to move's legal actions."""
+        rows = np.arange(self.num_games)
+        own = self.pods[rows, self.side]
+        occupied = self.pods[:, 0] | self.pods[:, 1]
+        empty = ~occupied
+        actions = np.empty((self.num_games, BOARD_SIZE * BOARD_SIZE, ACTIONS_PER_SQUARE), dtype=bool)
+        for d in range(4):
+            back = OPPOSITE[d]
+            one_step = shift(own & self.prongs[:, d], d)
+            landings = shift(one_step & occupied, d) & empty
+            actions[:, :, STEP * 4 + d] = square_bits(shift(one_step & empty, back))
+            actions[:, :, JUMP * 4 + d] = square_bits(shift(shift(landings, back), back))
+            actions[:, :, PRONG * 4 + d] = square_bits(own & ~self.prongs[:, d])
+        return actions.reshape(self.num_games, NUM_ACTIONS)
+
+    def has_moves(self, player):
+        """Returns a bool per game telling whether a player index has any legal action."""
+        rows = np.arange(self.num_games)
+        own = self.pods[rows, player]
+        occupied = self.pods[:, 0] | self.pods[:, 1]
+        empty = ~occupied
+        found = np.zeros(self.num_games, dtype=bool)
+        for d in range(4):
+            one_step = shift(own & self.prongs[:, d], d)
+            found |= (own & ~self.prongs[:, d]) != 0
+            found |= (one_step & empty) != 0
+            found |= (shift(one_step & occupied, d) & empty) != 0
+        return found
+
+    def step(self, actions, validate=True):
+        """
+        Plays one action (a move.move_action index) in every game. Returns (rewards, dones):
+        the outcome of each game that just ended from player 0's side (+1 win, -1 loss, 0 draw,
+        as evaluator.terminal_value) and 0 elsewhere, and which games ended. Ended games are
+        reset to the initial position. Raises ValueError on an illegal action when validate is set.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        rows = np.arange(self.num_games)
+        if validate:
+            legal = self.legal_actions()[rows, actions]
+            if not legal.all():
+                raise ValueError(f"Illegal actions in games {np.flatnonzero(~legal).tolist()}")
+
+        start = actions // ACTIONS_PER_SQUARE
+        kind = actions % ACTIONS_PER_SQUARE // 4
+        direction = actions % 4
+        start_bits = _ONE << start.astype(np.uint64)
+
+        adding = kind == PRONG
+        self.prongs[rows[adding], direction[adding]] |= start_bits[adding]
+
+        moving = ~adding
+        movers, player, hop = rows[moving], self.side[moving], SQUARE_DELTAS[direction[moving]]
+        jump = kind[moving] == JUMP
+        end = start[moving] + hop * np.where(jump, 2, 1)
+        self._capture(movers[jump], 1 - player[jump], _ONE << (start[moving] + hop)[jump].astype(np.uint64))
+
+        from_bits, to_bits = start_bits[moving], _ONE << end.astype(np.uint64)
+        self.pods[movers, player] ^= from_bits | to_bits
+        for d in range(4):
+            prongs = self.prongs[movers, d]
+            self.prongs[movers, d] = (prongs & ~from_bits) | np.where((prongs & from_bits) != 0, to_bits, _ZERO)
+
+        winner = np.full(self.num_games, -1, dtype=np.int64)
+        won = (end // BOARD_SIZE == np.where(player == 0, BOARD_SIZE - 1, 0)) | (self.pods[movers, 1 - player] == 0)
+        winner[movers[won]] = player[won]
+
+        self.ply += 1
+        undecided = winner < 0
+        self.side ^= 1
+        has_moves = np.stack((self.has_moves(0), self.has_moves(1)))
+        draw = undecided & ((self.ply >= self.max_moves) | ~has_moves[self.side, rows])
+        dones = ~undecided | draw
+
+        rewards = np.where(winner == 0, 1.0, np.where(winner == 1, -1.0, 0.0)).astype(np.float32)
+        self.games_finished += int(dones.sum())
+        self.reset(dones)
+        return rewards, dones
+
+    def _capture(self, games, owners, bits):
+        """Removes the last prong (in N, S, E, W order) of each jumped enemy pod, and the pod once it has none left."""
+        hit = (self.pods[games, owners] & bits) != 0
+        games, owners, bits = games[hit], owners[hit], bits[hit]
+        removed = np.zeros(len(games), dtype=bool)
+        for d in reversed(range(4)):
+            has = ~removed & ((self.prongs[games, d] & bits) != 0)
+            self.prongs[games[has], d] &= ~bits[has]
+            removed |= has
+        remaining = np.zeros(len(games), dtype=bool)
+        for d in range(4):
+            remaining |= (self.prongs[games, d] & bits) != 0
+        self.pods[games[~remaining], owners[~remaining]] &= ~bits[~remaining]
+
+    def encode(self, out=None):
+        """Encodes every game's position like encoding.encode_board into a (num_games, FEATURE_SIZE) array."""
+        if out is None:
+            out = np.empty((self.num_games, FEATURE_SIZE), dtype=np.float32)
+        masks = np.concatenate((self.pods, self.prongs), axis=1)
+        out[:, :masks.shape[1] * 64] = square_bits(masks).reshape(self.num_games, -1)
+        out[:, masks.shape[1] * 64:] = self.side[:, None]
+        return out
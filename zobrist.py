@@ -0,0 +1,33 @@
+import random
+
+_rng = random.Random(0x0C71)
+
+# POD_KEYS[player][square], PRONG_KEYS[direction][square] and the side-to-move key, fixed across runs
+POD_KEYS = tuple(tuple(_rng.getrandbits(64) for _ in range(64)) for _ in range(2))
+PRONG_KEYS = tuple(tuple(_rng.getrandbits(64) for _ in range(64)) for _ in range(4))
+SIDE_KEY = _rng.getrandbits(64)
+
+
+def square_key(player, prongs, square):
+    """Returns the key of a pod of a player index with a 4-bit prong set on a square (0 if player is None)."""
+    if player is None:
+        return 0
+    key = POD_KEYS[player][square]
+    for d in range(4):
+        if prongs >> d & 1:
+            key ^= PRONG_KEYS[d][square]
+    return key
+
+
+def board_key(pods, prongs):
+    """Computes the key of a board from scratch, from its pods and prongs bitmasks."""
+    key = 0
+    for player in range(2):
+        for square in range(64):
+            if pods[player] >> square & 1:
+                key ^= POD_KEYS[player][square]
+    for d in range(4):
+        for square in range(64):
+            if prongs[d] >> square & 1:
+                key ^= PRONG_KEYS[d][square]
+    return key